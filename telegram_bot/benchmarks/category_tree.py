@@ -0,0 +1,82 @@
+"""Путь и потомки категории: обход по одной категории за запрос против рекурсивного CTE.
+
+Строит в БД синтетическое дерево глубиной DEPTH (по FANOUT подкатегорий на
+уровень вдоль одной ветки), сравнивает задержку и удаляет дерево.
+"""
+import asyncio
+
+from common import measure, report
+
+from sqlalchemy import select, delete
+
+from bot.database.models import async_session, Category
+from bot.database.requests.products import get_category_full_path, get_category_descendants
+
+DEPTH = 10
+FANOUT = 3
+REPEAT = 200
+
+
+async def build_tree() -> tuple[int, int]:
+    """Возвращает (id корня, id самой глубокой категории)."""
+    async with async_session() as session:
+        root = Category(name="__bench_root__", sort_order=0)
+        session.add(root)
+        await session.flush()
+        parent = root
+        for level in range(1, DEPTH):
+            children = [Category(name=f"__bench_{level}_{i}__", parent_id=parent.id, sort_order=i)
+                        for i in range(FANOUT)]
+            session.add_all(children)
+            await session.flush()
+            parent = children[0]
+        await session.commit()
+        return root.id, parent.id
+
+
+async def drop_tree(root_id: int):
+    ids = [root_id] + [c.id for c in await get_category_descendants(root_id)]
+    async with async_session() as session:
+        # Сначала самые глубокие, чтобы не нарушить внешний ключ parent_id
+        for category_id in reversed(ids):
+            await session.execute(delete(Category).where(Category.id == category_id))
+        await session.commit()
+
+
+async def full_path_by_walk(category_id: int) -> list[str]:
+    """Прежняя реализация: session.get на каждый уровень."""
+    path = []
+    async with async_session() as session:
+        current = await session.get(Category, category_id)
+        while current:
+            path.append(current.name)
+            current = await session.get(Category, current.parent_id) if current.parent_id else None
+    return list(reversed(path))
+
+
+async def descendants_by_level(category_id: int) -> list[Category]:
+    """Обход потомков по уровням: один запрос на уровень."""
+    result, level = [], [category_id]
+    async with async_session() as session:
+        while level:
+            children = (await session.scalars(select(Category).where(Category.parent_id.in_(level)))).all()
+            result.extend(children)
+            level = [c.id for c in children]
+    return result
+
+
+async def main():
+    root_id, leaf_id = await build_tree()
+    try:
+        assert await full_path_by_walk(leaf_id) == await get_category_full_path(leaf_id)
+        print(f"Synthetic tree: depth {DEPTH}, {FANOUT} children per level")
+        report("full path: session.get per level", await measure(lambda: full_path_by_walk(leaf_id), REPEAT))
+        report("full path: recursive CTE", await measure(lambda: get_category_full_path(leaf_id), REPEAT))
+        report("descendants: query per level", await measure(lambda: descendants_by_level(root_id), REPEAT))
+        report("descendants: recursive CTE", await measure(lambda: get_category_descendants(root_id), REPEAT))
+    finally:
+        await drop_tree(root_id)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
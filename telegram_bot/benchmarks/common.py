@@ -0,0 +1,31 @@
+"""Общие помощники бенчмарков.
+
+Скрипты запускаются из каталога telegram_bot: `python benchmarks/<имя>.py`.
+Бенчмарки, которым нужна БД, берут подключение из тех же настроек, что и бот
+(переменные окружения / ../.env) — запускайте их на отдельной тестовой базе.
+"""
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable
+
+PROJECT_DIR = Path(__file__).resolve().parents[1]
+if str(PROJECT_DIR) not in sys.path:
+    sys.path.insert(0, str(PROJECT_DIR))
+
+
+async def measure(fn: Callable[[], Awaitable], repeat: int) -> list[float]:
+    """Время `repeat` последовательных вызовов `fn` в секундах."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def report(name: str, samples: list[float]):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{name:<40} median {statistics.median(samples) * 1000:8.2f} ms   p95 {p95 * 1000:8.2f} ms   n={len(samples)}")
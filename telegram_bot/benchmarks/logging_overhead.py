@@ -0,0 +1,92 @@
+"""Время event loop в логировании: обработчики в вызывающем потоке против очереди.
+
+До: файловый и консольный обработчики вызываются прямо из корутины, форматирование
+и запись на диск блокируют event loop. После: корутина только кладёт запись в
+DroppingQueueHandler, обработчики работают в потоке QueueListener.
+
+Каждая выборка — BLOCK вызовов logger.info из корутины. Вариант «slow disk»
+добавляет задержку SLOW_WRITE в запись консольного обработчика, как у занятого
+диска или stdout, который не успевает читать Docker. Консоль пишется в os.devnull.
+"""
+import asyncio
+import logging
+import os
+import queue
+import tempfile
+import time
+from logging.handlers import QueueListener
+
+from common import measure, report
+
+from bot.utils.logger import CompressingRotatingFileHandler, DroppingQueueHandler
+
+BLOCK = 100
+REPEAT = 50
+SLOW_REPEAT = 20
+SLOW_WRITE = 0.0005
+# Все записи прогона помещаются в очередь: измеряется постановка в очередь, не потери
+QUEUE_SIZE = 10000
+
+
+class SlowStreamHandler(logging.StreamHandler):
+    def emit(self, record: logging.LogRecord):
+        time.sleep(SLOW_WRITE)
+        super().emit(record)
+
+
+def build_handlers(log_dir: str, devnull, slow: bool) -> list[logging.Handler]:
+    formatter = logging.Formatter("%(asctime)s | %(levelname)-8s | %(name)s | %(message)s")
+    file_handler = CompressingRotatingFileHandler(os.path.join(log_dir, "app.log"),
+                                                  maxBytes=10 * 1024 * 1024, encoding="utf-8")
+    console_handler = (SlowStreamHandler if slow else logging.StreamHandler)(devnull)
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+    return [file_handler, console_handler]
+
+
+def make_logger(name: str, handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger(f"bench.{name}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.handlers = [handler]
+    return logger
+
+
+async def bench(name: str, logger: logging.Logger, repeat: int):
+    counter = 0
+
+    async def log_block():
+        nonlocal counter
+        for _ in range(BLOCK):
+            counter += 1
+            logger.info(f"Update from user {counter % 1000}: message 'hello' in chat {counter}")
+
+    report(f"{name} (per {BLOCK} records)", await measure(log_block, repeat))
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as log_dir, open(os.devnull, "w") as devnull:
+        for slow in (False, True):
+            suffix = ", slow disk" if slow else ""
+            repeat = SLOW_REPEAT if slow else REPEAT
+
+            handlers = build_handlers(log_dir, devnull, slow)
+            logger = make_logger("direct", handlers[0])
+            logger.addHandler(handlers[1])
+            await bench(f"before: direct handlers{suffix}", logger, repeat)
+
+            queue_handler = DroppingQueueHandler(queue.Queue(maxsize=QUEUE_SIZE))
+            listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+            listener.start()
+            await bench(f"after: queue + listener{suffix}", make_logger("queued", queue_handler), repeat)
+            started = time.perf_counter()
+            listener.stop()
+            print(f"{'':<40} listener drained in {(time.perf_counter() - started) * 1000:.0f} ms, "
+                  f"dropped {queue_handler.dropped}")
+
+            for handler in handlers:
+                handler.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
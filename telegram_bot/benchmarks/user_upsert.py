@@ -0,0 +1,87 @@
+"""add_user: прежний select-then-insert против INSERT ... ON CONFLICT на 1M пользователей.
+
+Заполняет users синтетическими пользователями через generate_series (user_id
+из диапазона, не пересекающегося с Telegram id), сравнивает задержку для уже
+существующих и новых пользователей, проверяет, что параллельные апдейты
+нового пользователя не создают дубликатов, и удаляет синтетические строки.
+"""
+import asyncio
+import itertools
+
+from common import measure, report
+
+from sqlalchemy import select, func, delete, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from bot.database.models import async_session, User
+from bot.database.requests.users import add_user
+
+USERS = 1_000_000
+REPEAT = 500
+CONCURRENT = 50
+BASE_ID = 9_000_000_000_000
+
+
+async def seed():
+    async with async_session() as session:
+        await session.execute(text("""
+            INSERT INTO users (user_id, full_name, username, last_activity, created_at, updated_at)
+            SELECT :base + n, 'bench ' || n, NULL, now(), now(), now()
+            FROM generate_series(1, :count) AS n
+            ON CONFLICT (user_id) DO NOTHING
+        """), {"base": BASE_ID, "count": USERS})
+        await session.commit()
+        await session.execute(text("ANALYZE users"))
+
+
+async def cleanup():
+    async with async_session() as session:
+        await session.execute(delete(User).where(User.user_id > BASE_ID))
+        await session.commit()
+
+
+async def add_user_select_then_insert(user_id: int, **kwargs) -> User:
+    """Прежняя реализация: отдельные SELECT и INSERT в одной сессии."""
+    async with async_session() as session:
+        try:
+            user = await session.scalar(select(User).where(User.user_id == user_id))
+            if not user:
+                user = User(user_id=user_id, **kwargs)
+                session.add(user)
+                await session.commit()
+                await session.refresh(user)
+            return user
+        except SQLAlchemyError:
+            await session.rollback()
+            raise
+
+
+async def main():
+    await seed()
+    try:
+        existing = itertools.cycle(range(BASE_ID + 1, BASE_ID + USERS + 1, USERS // REPEAT))
+        new_ids = itertools.count(BASE_ID + USERS + 1)
+
+        async def call(fn, ids):
+            user = await fn(next(ids), full_name="bench", username=None)
+            # Атрибуты читаются после закрытия сессии, как в кэше пользователей
+            assert user.id and user.user_id
+
+        print(f"users table: {USERS} synthetic users")
+        report("existing: select-then-insert", await measure(lambda: call(add_user_select_then_insert, existing), REPEAT))
+        report("existing: upsert", await measure(lambda: call(add_user, existing), REPEAT))
+        report("new: select-then-insert", await measure(lambda: call(add_user_select_then_insert, new_ids), REPEAT))
+        report("new: upsert", await measure(lambda: call(add_user, new_ids), REPEAT))
+
+        racing_id = next(new_ids)
+        await asyncio.gather(*(add_user(racing_id, full_name="bench", username=None) for _ in range(CONCURRENT)))
+        async with async_session() as session:
+            rows = await session.scalar(select(func.count()).select_from(User).where(User.user_id == racing_id))
+        assert rows == 1, f"{rows} rows for one user after {CONCURRENT} concurrent upserts"
+        print(f"{CONCURRENT} concurrent upserts of one new user -> {rows} row")
+    finally:
+        await cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
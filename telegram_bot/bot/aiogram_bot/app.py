@@ -5,19 +5,44 @@ from aiogram.client.default import DefaultBotProperties
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.fsm.storage.redis import RedisStorage
 
+from bot.aiogram_bot.misc.broadcast_jobs import resume_broadcast_jobs, stop_broadcast_jobs
 from bot.aiogram_bot.misc.middlewares import register_middlewares
 from bot.aiogram_bot.misc.middlewares.admin_middleware import IsAdminMiddleware
+from bot.aiogram_bot.misc.middlewares.blocked_user_middleware import BlockedUserRequestMiddleware
+from bot.database.activity import activity_tracker
+from bot.database.catalog_export import catalog_exporter
+from bot.database.catalog_sync import catalog_sync
 from bot.database.models import on_startup_database
+from bot.database.user_cache import user_cache
+from bot.database.user_stats import user_stats
 from bot.utils.config import settings
+from bot.utils.metrics import metrics
 
 
 async def aiogram_on_startup(bot: Bot):
     await on_startup_database()
+    await catalog_sync.start()
+    user_cache.start()
+    activity_tracker.start()
+    user_stats.start()
+    metrics.start(settings.METRICS_LOG_INTERVAL)
+
+    await resume_broadcast_jobs(bot)
 
     bot_info = await bot.get_me()
     logging.info("Bot has been started! -> @" + str(bot_info.username))
 
 
+async def aiogram_on_shutdown():
+    await stop_broadcast_jobs()
+    await user_cache.stop()
+    await activity_tracker.stop()
+    await user_stats.stop()
+    await metrics.stop()
+    await catalog_exporter.flush()
+    await catalog_sync.stop()
+
+
 def register_routers(dp: Dispatcher):
     from bot.aiogram_bot.handlers.users import menu, view, any
     from bot.aiogram_bot.handlers.admins import join, mass_send, stats, items_management
@@ -49,6 +74,7 @@ def register_routers(dp: Dispatcher):
 
 async def aiogram_start():
     bot = Bot(token=settings.TG_TOKEN, default=DefaultBotProperties(parse_mode='HTML'))
+    bot.session.middleware(BlockedUserRequestMiddleware())
     if not settings.REDIS_URL:
         storage = MemoryStorage()
     else:
@@ -57,5 +83,6 @@ async def aiogram_start():
 
     register_middlewares(dp)
     register_routers(dp)
+    dp.shutdown.register(aiogram_on_shutdown)
     await aiogram_on_startup(bot)
     await dp.start_polling(bot)
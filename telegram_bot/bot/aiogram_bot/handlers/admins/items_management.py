@@ -11,6 +11,7 @@ from bot.aiogram_bot.markups.admin_keyboards import (
     get_skip_keyboard,
 )
 from bot.aiogram_bot.misc.states import AdminState
+from bot.database.catalog import catalog
 from bot.database.requests import products as db
 from bot.utils.item_sender import send_item_content
 
@@ -36,7 +37,7 @@ async def noop_handler(callback: types.CallbackQuery):
 @router.callback_query(F.data.startswith("sort_cat_up_"))
 async def sort_category_up(callback: types.CallbackQuery, state: FSMContext):
     cat_id = int(callback.data.split("_")[3])
-    category = await db.get_category_by_id(cat_id)
+    category = catalog.get_category(cat_id)
     moved = await db.move_category(cat_id, "up")
     if not moved:
         await callback.answer("Невозможно переместить")
@@ -53,7 +54,7 @@ async def sort_category_up(callback: types.CallbackQuery, state: FSMContext):
 @router.callback_query(F.data.startswith("sort_cat_down_"))
 async def sort_category_down(callback: types.CallbackQuery, state: FSMContext):
     cat_id = int(callback.data.split("_")[3])
-    category = await db.get_category_by_id(cat_id)
+    category = catalog.get_category(cat_id)
     moved = await db.move_category(cat_id, "down")
     if not moved:
         await callback.answer("Невозможно переместить")
@@ -76,7 +77,7 @@ async def sort_category_swap(callback: types.CallbackQuery, state: FSMContext):
         await callback.answer("Невозможно переместить")
         return
     await callback.answer("Поменяли местами")
-    cat = await db.get_category_by_id(left_id)
+    cat = catalog.get_category(left_id)
     parent_id = cat.parent_id if cat else None
     kb, text = await build_category_keyboard(parent_id)
     try:
@@ -90,7 +91,7 @@ async def sort_category_swap(callback: types.CallbackQuery, state: FSMContext):
 @router.callback_query(F.data.startswith("sort_item_up_"))
 async def sort_item_up(callback: types.CallbackQuery, state: FSMContext):
     item_id = int(callback.data.split("_")[3])
-    item = await db.get_item_by_id(item_id)
+    item = catalog.get_item(item_id)
     moved = await db.move_item(item_id, "up")
     if not moved:
         await callback.answer("Невозможно переместить")
@@ -106,7 +107,7 @@ async def sort_item_up(callback: types.CallbackQuery, state: FSMContext):
 @router.callback_query(F.data.startswith("sort_item_down_"))
 async def sort_item_down(callback: types.CallbackQuery, state: FSMContext):
     item_id = int(callback.data.split("_")[3])
-    item = await db.get_item_by_id(item_id)
+    item = catalog.get_item(item_id)
     moved = await db.move_item(item_id, "down")
     if not moved:
         await callback.answer("Невозможно переместить")
@@ -128,7 +129,7 @@ async def sort_item_swap(callback: types.CallbackQuery, state: FSMContext):
         await callback.answer("Невозможно переместить")
         return
     await callback.answer("Поменяли местами")
-    item = await db.get_item_by_id(left_id)
+    item = catalog.get_item(left_id)
     kb, text = await build_category_keyboard(item.category_id)
     try:
         await callback.message.edit_text(text, reply_markup=kb)
@@ -456,7 +457,7 @@ async def finish_add_category(event, state: FSMContext, prompt_text: str | None)
 @router.callback_query(F.data.startswith("del_cat_"))
 async def delete_category_handler(callback: types.CallbackQuery):
     cat_id = int(callback.data.split("_")[2])
-    category = await db.get_category_by_id(cat_id)
+    category = catalog.get_category(cat_id)
     parent_id = category.parent_id
     await db.delete_category(cat_id)
     await callback.answer("Категория удалена", show_alert=True)
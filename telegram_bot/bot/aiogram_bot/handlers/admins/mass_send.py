@@ -1,19 +1,24 @@
-import json
 import logging
 from typing import List
 
 from aiogram import Router, F, types
+from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
-from aiogram.utils.serialization import deserialize_telegram_object_to_python
 
 from bot.aiogram_bot.markups.keyboards import admin_keyboard, mass_mail_keyboard, back_keyboard
-from bot.aiogram_bot.misc.media_utils import copy_post
+from bot.aiogram_bot.misc.broadcast_jobs import REPLICA_ID, progress_text, start_broadcast_job
+from bot.aiogram_bot.misc.broadcaster import BroadcastStats
 from bot.aiogram_bot.misc.states import MassSend
 from bot.database.models import User
-from bot.database.requests.users import get_user_ids
+from bot.database.requests.broadcasts import (
+    create_broadcast_job,
+    get_recent_broadcast_jobs,
+    set_broadcast_progress_message,
+)
+from bot.database.requests.users import get_users_count
 from bot.texts import MASS_SEND_BTN
-from bot.texts import OK_BTN, ADMIN_WAIT_MASS_MSG_TEXT, ADMIN_CHECK_POST_TEXT, \
-    ADMIN_MASS_MAIL_START_TEXT, ADMIN_MASS_MAIL_END_TEXT
+from bot.texts import OK_BTN, ADMIN_WAIT_MASS_MSG_TEXT, ADMIN_CHECK_POST_TEXT, ADMIN_MASS_MAIL_START_TEXT, \
+    ADMIN_BROADCASTS_TEXT, ADMIN_BROADCASTS_ROW_TEXT, ADMIN_BROADCASTS_EMPTY_TEXT
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -29,26 +34,38 @@ async def mass_send(message: types.Message, state: FSMContext):
 
 @router.message(MassSend.msg)
 async def send_users_2(message: types.Message, state: FSMContext, user: User, album: List[types.Message] = None):
-    await copy_post(album or message, user.user_id, message.bot)
+    message_ids = sorted(m.message_id for m in album) if album else [message.message_id]
+    await message.bot.copy_messages(user.user_id, message.chat.id, message_ids)
     await message.answer(ADMIN_CHECK_POST_TEXT, reply_markup=mass_mail_keyboard)
-    json_album = [json.dumps(deserialize_telegram_object_to_python(m)) for m in album] if album else None
-    json_msg = json.dumps(deserialize_telegram_object_to_python(message))
-    await state.update_data(json_album=json_album, json_msg=json_msg)
+    await state.update_data(from_chat_id=message.chat.id, message_ids=message_ids)
     await state.set_state(MassSend.confirmation)
 
 
 @router.message(MassSend.confirmation, F.text == OK_BTN)
 async def send_users_3(message: types.Message, state: FSMContext):
-    users = await get_user_ids()
+    total = await get_users_count()
     data = await state.get_data()
     await state.clear()
-    waitmsg = await message.answer(ADMIN_MASS_MAIL_START_TEXT.format(str(len(users))), reply_markup=admin_keyboard)
-    album = [types.Message.model_validate(json.loads(m)) for m in data.get("json_album")] if data.get(
-        "json_album") else None
-    msg = types.Message.model_validate(json.loads(data.get("json_msg"))) if data.get("json_msg") else None
-    for user_ in users:
-        try:
-            await copy_post(album or msg, user_, message.bot)
-        except Exception as e:
-            continue
-    await waitmsg.reply(ADMIN_MASS_MAIL_END_TEXT)
+    payload = {"from_chat_id": data.get("from_chat_id"), "message_ids": data.get("message_ids")}
+    job = await create_broadcast_job(payload, admin_chat_id=message.chat.id, total=total, owner=REPLICA_ID)
+    await message.answer(ADMIN_MASS_MAIL_START_TEXT.format(str(total)), reply_markup=admin_keyboard)
+    waitmsg = await message.answer(progress_text(BroadcastStats(total)))
+    await set_broadcast_progress_message(job.id, waitmsg.message_id)
+    job.progress_message_id = waitmsg.message_id
+    start_broadcast_job(message.bot, job)
+
+
+@router.message(Command("broadcasts"))
+async def broadcasts_list(message: types.Message):
+    jobs = await get_recent_broadcast_jobs()
+    if not jobs:
+        await message.answer(ADMIN_BROADCASTS_EMPTY_TEXT)
+        return
+    lines = [
+        ADMIN_BROADCASTS_ROW_TEXT.format(
+            id=job.id, date=job.created_at.strftime("%d.%m.%Y %H:%M"), status=job.status,
+            sent=job.sent, blocked=job.blocked, failed=job.failed, total=job.total,
+        )
+        for job in jobs
+    ]
+    await message.answer(ADMIN_BROADCASTS_TEXT.format("\n".join(lines)))
@@ -1,10 +1,19 @@
 import logging
 
 from aiogram import Router, F, types
+from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 
-from bot.database.requests.users import get_user_stats
-from bot.texts import STATS_BTN
+from bot.aiogram_bot.misc.middlewares.queue_middleware import get_deepest_queues
+from bot.database.user_stats import user_stats
+from bot.texts import (
+    STATS_BTN,
+    ADMIN_RETENTION_TEXT,
+    ADMIN_QUEUES_TEXT,
+    ADMIN_QUEUES_ROW_TEXT,
+    ADMIN_QUEUES_EMPTY_TEXT,
+)
+from bot.utils.metrics import metrics
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -12,20 +21,57 @@ logger = logging.getLogger(__name__)
 
 @router.message(F.text == STATS_BTN)
 async def stats_btn(message: types.Message, state: FSMContext):
-    stats = await get_user_stats()
+    stats = await user_stats.get_stats()
 
     text = (
         "<b>Статистика</b>\n\n"
         "<blockquote>"
         "Всего пользователей: {total}\n\n"
-        "Пользователей за 24ч/3д/7д/30д: {n24}/{n3}/{n7}/{n30}\n\n"
-        "Активных пользователей за 24ч/3д/7д/30д: {a24}/{a3}/{a7}/{a30}"
+        "Пользователей за сегодня/3д/7д/30д: {n1}/{n3}/{n7}/{n30}\n\n"
+        "Активных пользователей за сегодня/3д/7д/30д: {a1}/{a3}/{a7}/{a30}\n\n"
+        "Заблокировали бота: {blocked}"
         "</blockquote>"
     ).format(
         total=stats["total_users"],
-        n24=stats["new_users_24h"], n3=stats["new_users_3d"],
+        n1=stats["new_users_1d"], n3=stats["new_users_3d"],
         n7=stats["new_users_7d"], n30=stats["new_users_30d"],
-        a24=stats["active_users_24h"], a3=stats["active_users_3d"],
+        a1=stats["active_users_1d"], a3=stats["active_users_3d"],
         a7=stats["active_users_7d"], a30=stats["active_users_30d"],
+        blocked=stats["blocked_users"],
     )
-    await message.answer(text)
\ No newline at end of file
+    await message.answer(text)
+
+@router.message(Command("retention"))
+async def retention_cmd(message: types.Message, state: FSMContext):
+    retention = await user_stats.get_retention()
+    await message.answer(ADMIN_RETENTION_TEXT.format(
+        dau=retention["dau"], avg_dau=retention["avg_dau"],
+        wau=retention["wau"], mau=retention["mau"],
+        stickiness=retention["stickiness"],
+        cohorts=format_cohorts(retention["cohorts"]),
+    ))
+
+
+def format_cohorts(cohorts: list) -> str:
+    """Таблица когорт: неделя регистрации, размер и % активных на неделях 0, 1, 2, ..."""
+    weeks = max((len(active) for _, _, active in cohorts), default=0)
+    lines = ["Неделя Польз. " + " ".join(f"{n:>3}" for n in range(weeks))]
+    for week, size, active in cohorts:
+        percents = " ".join(f"{round(100 * users / size) if size else 0:>3}" for users in active)
+        lines.append(f"{week:%d.%m}  {size:>6} {percents}")
+    return "\n".join(lines)
+
+
+@router.message(Command("queues"))
+async def queues_cmd(message: types.Message, state: FSMContext):
+    rows = [
+        ADMIN_QUEUES_ROW_TEXT.format(user_id=user_id, kind=kind, depth=depth, wait=wait)
+        for kind, user_id, depth, wait in get_deepest_queues(10)
+    ]
+    await message.answer(ADMIN_QUEUES_TEXT.format(
+        depth=metrics.gauges["queue_depth"](),
+        workers=metrics.gauges["queue_workers"](),
+        wait=metrics.histograms["queue_wait"].snapshot().describe(),
+        exec=metrics.histograms["queue_exec"].snapshot().describe(),
+        rows="\n".join(rows) or ADMIN_QUEUES_EMPTY_TEXT,
+    ))
@@ -4,7 +4,7 @@ from aiogram import Router, F, types
 from aiogram.fsm.context import FSMContext
 
 from bot.aiogram_bot.markups.keyboards import get_main_keyboard
-from bot.aiogram_bot.markups.user_keyboards import build_user_category_keyboard
+from bot.aiogram_bot.markups.user_keyboards import get_user_category_view
 from bot.database.models import User
 from bot.texts import BACK_BTN
 
@@ -18,7 +18,7 @@ async def start_btn(message: types.Message, state: FSMContext, user: User):
     await state.clear()
     await state.update_data(active_filter=None)
     
-    kb, text = await build_user_category_keyboard(None)
+    kb, text = get_user_category_view(None)
     
     await message.bot.send_message(
         user.user_id,
@@ -42,7 +42,7 @@ async def back_btn(message: types.Message, state: FSMContext, user: User):
     await state.clear()
     await state.update_data(active_filter=None)
     
-    kb, text = await build_user_category_keyboard(None)
+    kb, text = get_user_category_view(None)
     
     await message.bot.send_message(
         user.user_id,
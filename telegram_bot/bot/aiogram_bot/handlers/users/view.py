@@ -4,11 +4,12 @@ from aiogram import Router, F, types
 from aiogram.fsm.context import FSMContext
 
 from bot.aiogram_bot.markups.user_keyboards import (
-    build_user_category_keyboard,
+    FILTER_NAMES,
     get_back_to_category_keyboard,
-    get_filter_selection_keyboard
+    get_filter_selection_keyboard,
+    get_user_category_view,
 )
-from bot.database.requests import products as db
+from bot.database.catalog import catalog
 from bot.utils.item_sender import send_item_content
 
 router = Router()
@@ -18,7 +19,7 @@ logger = logging.getLogger(__name__)
 @router.callback_query(F.data == "user_cat_root")
 async def nav_user_root(callback: types.CallbackQuery, state: FSMContext):
     await state.update_data(active_filter=None)
-    kb, text = await build_user_category_keyboard(None)
+    kb, text = get_user_category_view(None)
     try:
         await callback.message.edit_text(text, reply_markup=kb)
     except Exception:
@@ -44,10 +45,9 @@ async def open_filter_menu(callback: types.CallbackQuery, state: FSMContext):
 @router.callback_query(F.data.startswith("set_filter_"))
 async def set_filter(callback: types.CallbackQuery, state: FSMContext):
     filter_type = callback.data.split("_")[2]
-    if filter_type == "none":
-        await state.update_data(active_filter=None)
-    else:
-        await state.update_data(active_filter=filter_type)
+    # callback_data приходит от клиента: неизвестный фильтр (в том числе "none")
+    # означает отсутствие фильтра и не порождает записей в кэше клавиатур
+    await state.update_data(active_filter=filter_type if filter_type in FILTER_NAMES else None)
     data = await state.get_data()
     cat_id = data.get("filter_category_id")
     await show_category(callback.message, cat_id, state)
@@ -56,18 +56,9 @@ async def set_filter(callback: types.CallbackQuery, state: FSMContext):
 async def show_category(message: types.Message, cat_id: int | None, state: FSMContext, edit: bool = True):
     data = await state.get_data()
     active_filter = data.get("active_filter")
-    kb, text = await build_user_category_keyboard(cat_id)
-
-    if active_filter:
-        filter_name = {
-            "document": "PDF / Документы",
-            "pptx": "Презентации (PPTX)",
-            "video": "Видео",
-            "text": "Текст"
-        }.get(active_filter, active_filter)
-        text += f"\n\nФильтр: <b>{filter_name}</b>"
-
-    items = await db.get_items_by_category(cat_id)
+    kb, text = get_user_category_view(cat_id, active_filter)
+
+    items = catalog.get_items(cat_id)
     if items and active_filter:
         items = [i for i in items if i.content_type == active_filter]
 
@@ -96,7 +87,7 @@ async def show_category(message: types.Message, cat_id: int | None, state: FSMCo
 @router.callback_query(F.data.startswith("user_item_"))
 async def view_item(callback: types.CallbackQuery):
     item_id = int(callback.data.split("_")[2])
-    item = await db.get_item_by_id(item_id)
+    item = catalog.get_item(item_id)
     caption = f"<b>{item.name}</b>"
     if item.description:
         caption += f"\n\n{item.description}"
@@ -12,20 +12,19 @@ async def build_category_keyboard(current_category_id: int | None = None):
     """
     builder = InlineKeyboardBuilder()
 
+    view = await db.get_category_view(current_category_id)
+    categories = view.children
     if current_category_id is None:
-        categories = await db.get_root_categories()
         header_text = "<b>Корневые категории</b>"
     else:
-        categories = await db.get_subcategories(current_category_id)
-        current_cat = await db.get_category_by_id(current_category_id)
-        header_text = f"Категория: <b>{current_cat.name}</b>"
+        header_text = f"Категория: <b>{view.category.name}</b>"
 
     # Категории по 2 в ряд
     _add_grid_with_sort(builder, categories, prefix="cat", is_category=True)
 
     # Предметы
     if current_category_id is not None:
-        items = await db.get_items_by_category(current_category_id)
+        items = view.items
         if categories and items:
             builder.row(types.InlineKeyboardButton(text="--- Предметы ---", callback_data="noop"))
         _add_grid_with_sort(builder, items, prefix="item", is_category=False)
@@ -44,7 +43,7 @@ async def build_category_keyboard(current_category_id: int | None = None):
             types.InlineKeyboardButton(text="Текст", callback_data=f"edit_prompt_{current_category_id}"))
         control_buttons.append(
             types.InlineKeyboardButton(text="Удалить категорию", callback_data=f"del_cat_{current_category_id}"))
-        parent = (await db.get_category_by_id(current_category_id)).parent_id
+        parent = view.parent_id
         back_cb = f"nav_cat_{parent}" if parent else "nav_cat_root"
         control_buttons.append(types.InlineKeyboardButton(text="Назад", callback_data=back_cb))
 
@@ -2,21 +2,30 @@ from aiogram import types
 from aiogram.types import InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from bot.database.requests import products as db
+from bot.database.catalog import catalog
 from bot.texts import START_TEXT
 
+FILTER_NAMES = {
+    "document": "PDF / Документы",
+    "pptx": "Презентации (PPTX)",
+    "video": "Видео",
+    "text": "Текст",
+}
 
-async def build_user_category_keyboard(current_category_id: int | None = None):
+# (category_id, active_filter) -> (клавиатура, текст заголовка)
+_category_views: dict[tuple[int | None, str | None], tuple[InlineKeyboardMarkup, str]] = {}
+
+
+def build_user_category_keyboard(current_category_id: int | None = None):
     """Строит клавиатуру для навигации пользователя по категориям.
-    Категории по 2 в ряд."""
+    Категории по 2 в ряд. Данные берутся из снимка каталога, без обращений к БД."""
     builder = InlineKeyboardBuilder()
 
+    categories = catalog.get_children(current_category_id)
     if current_category_id is None:
-        categories = await db.get_root_categories()
         header_text = START_TEXT
     else:
-        categories = await db.get_subcategories(current_category_id)
-        current_cat = await db.get_category_by_id(current_category_id)
+        current_cat = catalog.get_category(current_category_id)
         header_text = current_cat.prompt_text if current_cat.prompt_text else f"<b>{current_cat.name}</b>"
 
     # Категории по 2 в ряд
@@ -33,25 +42,59 @@ async def build_user_category_keyboard(current_category_id: int | None = None):
     builder.row(types.InlineKeyboardButton(text="Фильтр", callback_data=filter_cb))
 
     if current_category_id is not None:
-        parent = (await db.get_category_by_id(current_category_id)).parent_id
+        parent = current_cat.parent_id
         back_cb = f"user_cat_{parent}" if parent else "user_cat_root"
         builder.row(types.InlineKeyboardButton(text="Назад", callback_data=back_cb))
 
     return builder.as_markup(), header_text
 
 
+def get_user_category_view(category_id: int | None, active_filter: str | None = None):
+    """Готовые клавиатура и заголовок категории из кеша.
+    Кеш сбрасывается выборочно при изменении каталога. Ключи приходят из
+    callback_data, поэтому кешируются только известные фильтры и категории."""
+    if active_filter not in FILTER_NAMES:
+        active_filter = None
+    key = (category_id, active_filter)
+    view = _category_views.get(key)
+    if view is None:
+        kb, text = build_user_category_keyboard(category_id)
+        if active_filter:
+            text += f"\n\nФильтр: <b>{FILTER_NAMES[active_filter]}</b>"
+        view = (kb, text)
+        if category_id is None or catalog.get_category(category_id) is not None:
+            _category_views[key] = view
+    return view
+
+
+def invalidate_user_category_views(category_ids: set[int | None] | None = None):
+    if category_ids is None:
+        _category_views.clear()
+        return
+    for key in [k for k in _category_views if k[0] in category_ids]:
+        del _category_views[key]
+
+
+catalog.add_listener(invalidate_user_category_views)
+
+
 def get_back_to_category_keyboard(category_id: int) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.button(text="К списку", callback_data=f"user_cat_{category_id}")
     return builder.as_markup()
 
 
-def get_filter_selection_keyboard() -> InlineKeyboardMarkup:
+def _build_filter_selection_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
-    builder.button(text="PDF / Документы", callback_data="set_filter_document")
-    builder.button(text="Презентации (PPTX)", callback_data="set_filter_pptx")
-    builder.button(text="Видео", callback_data="set_filter_video")
-    builder.button(text="Текст", callback_data="set_filter_text")
+    for filter_type, filter_name in FILTER_NAMES.items():
+        builder.button(text=filter_name, callback_data=f"set_filter_{filter_type}")
     builder.button(text="Без фильтра", callback_data="set_filter_none")
     builder.adjust(1)
-    return builder.as_markup()
\ No newline at end of file
+    return builder.as_markup()
+
+
+filter_selection_keyboard = _build_filter_selection_keyboard()
+
+
+def get_filter_selection_keyboard() -> InlineKeyboardMarkup:
+    return filter_selection_keyboard
\ No newline at end of file
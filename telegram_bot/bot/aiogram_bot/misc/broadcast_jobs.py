@@ -0,0 +1,244 @@
+import asyncio
+import contextlib
+import logging
+import uuid
+from datetime import timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from aiogram import Bot
+
+from bot.aiogram_bot.misc.broadcaster import Broadcaster, BroadcastStats
+from bot.database.models import BroadcastJob
+from bot.database.requests.broadcasts import (
+    SENDING,
+    BroadcastLeaseLost,
+    acquire_broadcast_job,
+    claim_deliveries,
+    fail_interrupted_deliveries,
+    finish_broadcast_job,
+    get_unfinished_broadcast_jobs,
+    prune_broadcast_deliveries,
+    record_delivery_results,
+    release_broadcast_job,
+    release_deliveries,
+    renew_broadcast_lease,
+)
+from bot.database.requests.users import iter_user_batches
+from bot.texts import ADMIN_MASS_MAIL_PROGRESS_TEXT, ADMIN_MASS_MAIL_END_TEXT
+from bot.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Владелец аренды задач рассылки, которые выполняет этот процесс
+REPLICA_ID = uuid.uuid4().hex
+
+_tasks: dict[int, asyncio.Task] = {}
+_watcher: asyncio.Task | None = None
+
+
+def start_broadcast_job(bot: Bot, job: BroadcastJob, resumed: bool = False):
+    """Запускает задачу, аренда которой уже принадлежит REPLICA_ID."""
+    task = asyncio.create_task(_run_job(bot, job, resumed))
+    _tasks[job.id] = task
+    task.add_done_callback(lambda _: _tasks.pop(job.id, None))
+
+
+async def resume_broadcast_jobs(bot: Bot):
+    """Продолжает рассылки, прерванные перезапуском, с последней контрольной точки.
+
+    Задача берётся только в аренду: её не выполняет другая реплика или аренда
+    истекла. Затем каждые BROADCAST_LEASE_TIMEOUT секунд подбираются задачи
+    упавших реплик.
+    """
+    global _watcher
+    pruned = await prune_broadcast_deliveries(timedelta(days=settings.BROADCAST_DELIVERIES_RETENTION_DAYS))
+    if pruned:
+        logger.info(f"Pruned {pruned} delivery statuses of old broadcasts")
+    await _resume_orphaned_jobs(bot)
+    _watcher = asyncio.create_task(_watch_orphaned_jobs(bot))
+
+
+async def _resume_orphaned_jobs(bot: Bot):
+    for job in await get_unfinished_broadcast_jobs():
+        if job.id in _tasks:
+            continue
+        job = await acquire_broadcast_job(job.id, REPLICA_ID, settings.BROADCAST_LEASE_TIMEOUT)
+        if job is not None:
+            logger.info(f"Resuming broadcast job {job.id} from user #{job.cursor}")
+            start_broadcast_job(bot, job, resumed=True)
+
+
+async def _watch_orphaned_jobs(bot: Bot):
+    while True:
+        await asyncio.sleep(settings.BROADCAST_LEASE_TIMEOUT)
+        try:
+            await _resume_orphaned_jobs(bot)
+        except Exception as e:
+            logger.exception(f"Failed to resume orphaned broadcast jobs: {e}")
+
+
+async def stop_broadcast_jobs():
+    """Останавливает рассылки; их состояние остаётся в БД, аренда освобождается
+    для продолжения после старта или другой репликой."""
+    tasks = list(_tasks.values())
+    if _watcher is not None:
+        tasks.append(_watcher)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _keep_lease(job_id: int, runner: asyncio.Task):
+    """Продлевает аренду; если её забрала другая реплика, останавливает рассылку."""
+    while True:
+        await asyncio.sleep(settings.BROADCAST_LEASE_TIMEOUT / 3)
+        try:
+            renewed = await renew_broadcast_lease(job_id, REPLICA_ID)
+        except Exception as e:
+            logger.warning(f"Failed to renew lease of broadcast job {job_id}: {e}")
+            continue
+        if not renewed:
+            logger.warning(f"Broadcast job {job_id} was taken over by another replica, stopping")
+            runner.cancel()
+            return
+
+
+def _build_sender(bot: Bot, payload: dict):
+    """Пост рассылки — исходные сообщения в чате админа; альбом и одиночное
+    сообщение копируются одним вызовом copyMessages на получателя."""
+    from_chat_id = payload["from_chat_id"]
+    message_ids = payload["message_ids"]
+
+    async def send(chat_id: int):
+        await bot.copy_messages(chat_id, from_chat_id, message_ids)
+
+    return send
+
+
+async def _run_job(bot: Bot, job: BroadcastJob, resumed: bool):
+    # Аренда у этой реплики, значит `sending` остались от прежнего исполнителя
+    interrupted = await fail_interrupted_deliveries(job.id) if resumed else 0
+    stats = BroadcastStats(job.total, sent=job.sent, failed=job.failed + interrupted, blocked=job.blocked)
+
+    async def on_progress(stats_: BroadcastStats):
+        if job.progress_message_id:
+            await bot.edit_message_text(progress_text(stats_), chat_id=job.admin_chat_id,
+                                        message_id=job.progress_message_id)
+
+    broadcaster = Broadcaster(_build_sender(bot, job.payload), stats, on_progress)
+    results: dict[int, str] = {}
+    # user_id -> users.id зарезервированных получателей, чьи итоги ещё не сохранены
+    claimed: dict[int, int] = {}
+    cursor = job.cursor
+
+    def remember_claimed(user_ids: list[int], rows: dict[int, int]):
+        for user_id in user_ids:
+            claimed[user_id] = rows[user_id]
+
+    def forget_saved(saved: dict[int, str]):
+        for user_id in saved:
+            del results[user_id]
+            del claimed[user_id]
+
+    async def recipients() -> AsyncIterator[int]:
+        """Резервирует получателей порциями по `concurrency`, когда воркерам
+        нужны следующие, и заодно сохраняет уже завершённые доставки. В `sending`
+        одновременно не больше трёх порций: отправляемые, очередь и новая."""
+        nonlocal cursor
+        async for rows in iter_user_batches(settings.BROADCAST_BATCH_SIZE, after_id=cursor):
+            for start in range(0, len(rows), broadcaster.concurrency):
+                chunk = rows[start:start + broadcaster.concurrency]
+                chunk_rows = {row.user_id: row.id for row in chunk}
+                user_ids = await _complete(claim_deliveries(job.id, list(chunk_rows)),
+                                           lambda ids: remember_claimed(ids, chunk_rows))
+                # Получатели до курсора зарезервированы и повторно не отправляются
+                cursor = chunk[-1].id
+                done = {u: s for u, s in results.items() if s != SENDING}
+                await _complete(record_delivery_results(job.id, REPLICA_ID, done, cursor),
+                                lambda _: forget_saved(done))
+                for user_id in user_ids:
+                    yield user_id
+
+    broadcaster.start()
+    lease = asyncio.create_task(_keep_lease(job.id, asyncio.current_task()))
+    try:
+        try:
+            async with contextlib.aclosing(recipients()) as stream:
+                await broadcaster.deliver(stream, results)
+        except asyncio.CancelledError:
+            await asyncio.shield(_save_partial(job.id, results, claimed, cursor))
+            raise
+        await record_delivery_results(job.id, REPLICA_ID, results, cursor)
+    except asyncio.CancelledError:
+        logger.info(f"Broadcast job {job.id} paused at user #{cursor}")
+        await asyncio.shield(release_broadcast_job(job.id, REPLICA_ID))
+        raise
+    except BroadcastLeaseLost as e:
+        logger.warning(f"Broadcast job {job.id} stopped: {e}")
+        return
+    except Exception as e:
+        logger.exception(f"Broadcast job {job.id} stopped with error, it will be resumed later: {e}")
+        await release_broadcast_job(job.id, REPLICA_ID)
+        return
+    finally:
+        lease.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await lease
+        await broadcaster.stop()
+
+    job = await finish_broadcast_job(job.id)
+    await bot.send_message(
+        job.admin_chat_id,
+        ADMIN_MASS_MAIL_END_TEXT.format(sent=job.sent, blocked=job.blocked, failed=job.failed),
+        reply_to_message_id=job.progress_message_id,
+    )
+
+
+async def _complete(coro: Awaitable, on_done: Callable[[Any], None]) -> Any:
+    """Доводит запрос к БД до конца даже при отмене задачи: `on_done` получает
+    результат, и только затем отмена пробрасывается дальше. Иначе уже
+    сохранённое могло бы остаться неучтённым или записаться повторно."""
+    task = asyncio.ensure_future(coro)
+    try:
+        result = await asyncio.shield(task)
+    except asyncio.CancelledError:
+        on_done(await task)
+        raise
+    on_done(result)
+    return result
+
+
+async def _save_partial(job_id: int, results: dict[int, str], claimed: dict[int, int], cursor: int):
+    """При остановке сохраняет обработанных получателей и освобождает тех,
+    кому отправка ещё не начиналась; курсор возвращается к первому из них.
+    Незавершённые отправки остаются в статусе `sending` и при продолжении
+    считаются неудачными."""
+    unstarted = [user_id for user_id in claimed if user_id not in results]
+    if unstarted:
+        cursor = min(claimed[user_id] for user_id in unstarted) - 1
+    try:
+        await record_delivery_results(job_id, REPLICA_ID, {u: s for u, s in results.items() if s != SENDING},
+                                      cursor)
+    except BroadcastLeaseLost:
+        return
+    await release_deliveries(job_id, unstarted)
+
+
+def progress_text(stats: BroadcastStats) -> str:
+    return ADMIN_MASS_MAIL_PROGRESS_TEXT.format(
+        processed=stats.processed, total=stats.total, sent=stats.sent,
+        blocked=stats.blocked, failed=stats.failed, rate=stats.rate,
+        eta=format_duration(stats.eta),
+    )
+
+
+def format_duration(seconds: float | None) -> str:
+    if seconds is None:
+        return "—"
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours} ч {minutes} мин"
+    if minutes:
+        return f"{minutes} мин {secs} с"
+    return f"{secs} с"
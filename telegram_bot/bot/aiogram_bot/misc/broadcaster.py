@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import time
+from typing import AsyncIterable, Awaitable, Callable, Iterable
+
+from aiogram.exceptions import (
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+from bot.database.requests.broadcasts import SENDING, SENT, FAILED, BLOCKED
+from bot.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Равномерно распределяет отправки под глобальный лимит `rate` сообщений в секунду.
+
+    `pause()` останавливает все отправки (например, по TelegramRetryAfter).
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self._next_slot = 0.0
+        self._resume_at = 0.0
+
+    def pause(self, seconds: float):
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if self._resume_at > now:
+                await asyncio.sleep(self._resume_at - now)
+                continue
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+            if slot > now:
+                await asyncio.sleep(slot - now)
+            if self._resume_at <= time.monotonic():
+                return
+
+
+class BroadcastStats:
+    def __init__(self, total: int, sent: int = 0, failed: int = 0, blocked: int = 0):
+        self.total = total
+        self.sent = sent
+        self.failed = failed
+        self.blocked = blocked
+        self.started_at = time.monotonic()
+        self._processed_at_start = self.processed
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.failed + self.blocked
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return (self.processed - self._processed_at_start) / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> float | None:
+        rate = self.rate
+        if not rate:
+            return None
+        return max(self.total - self.processed, 0) / rate
+
+
+class Broadcaster:
+    """Рассылка с ограниченной параллельностью и общим лимитом скорости.
+
+    `send(chat_id)` выполняет отправку одному получателю. TelegramRetryAfter
+    приостанавливает всю рассылку на указанное время, сетевые и серверные
+    ошибки повторяются до `max_retries` раз, заблокировавшие бота
+    пользователи учитываются отдельно. `on_progress` вызывается каждые
+    `progress_interval` секунд и по завершении.
+
+    Получателей можно передать целиком в `run()` или через `deliver()` между
+    `start()` и `stop()`, в том числе асинхронным потоком, который выдаёт
+    следующих получателей по мере освобождения воркеров.
+    """
+
+    def __init__(
+            self,
+            send: Callable[[int], Awaitable],
+            stats: BroadcastStats,
+            on_progress: Callable[[BroadcastStats], Awaitable] | None = None,
+            rate: float = settings.BROADCAST_RATE,
+            concurrency: int = settings.BROADCAST_CONCURRENCY,
+            max_retries: int = settings.BROADCAST_MAX_RETRIES,
+            progress_interval: float = settings.BROADCAST_PROGRESS_INTERVAL,
+    ):
+        self.send = send
+        self.on_progress = on_progress
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.progress_interval = progress_interval
+        self.limiter = RateLimiter(rate)
+        self.stats = stats
+        self._progress_task: asyncio.Task | None = None
+
+    async def run(self, recipients: Iterable[int]) -> BroadcastStats:
+        self.start()
+        try:
+            await self.deliver(recipients)
+        finally:
+            await self.stop()
+        return self.stats
+
+    def start(self):
+        if self.on_progress:
+            self._progress_task = asyncio.create_task(self._report_progress())
+
+    async def stop(self):
+        if self._progress_task:
+            self._progress_task.cancel()
+            self._progress_task = None
+            await self._safe_progress()
+
+    async def deliver(self, recipients: Iterable[int] | AsyncIterable[int],
+                      results: dict[int, str] | None = None) -> dict[int, str]:
+        """Отправляет получателям одним пулом из `concurrency` воркеров; статус
+        каждого записывается в `results` по мере завершения, так что при отмене
+        там остаются уже обработанные. Очередь к воркерам не длиннее
+        `concurrency`: следующий получатель запрашивается у `recipients`, только
+        когда в ней есть место."""
+        results = {} if results is None else results
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+        workers = [asyncio.create_task(self._worker(queue, results)) for _ in range(self.concurrency)]
+        try:
+            if isinstance(recipients, AsyncIterable):
+                async for chat_id in recipients:
+                    await queue.put(chat_id)
+            else:
+                for chat_id in recipients:
+                    await queue.put(chat_id)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+        return results
+
+    async def _worker(self, queue: asyncio.Queue, results: dict[int, str]):
+        while True:
+            chat_id = await queue.get()
+            if chat_id is None:
+                return
+            results[chat_id] = SENDING
+            status = await self._deliver(chat_id)
+            results[chat_id] = status
+            if status == SENT:
+                self.stats.sent += 1
+            elif status == BLOCKED:
+                self.stats.blocked += 1
+            else:
+                self.stats.failed += 1
+
+    async def _deliver(self, chat_id: int) -> str:
+        attempt = 0
+        while True:
+            await self.limiter.acquire()
+            try:
+                await self.send(chat_id)
+                return SENT
+            except TelegramRetryAfter as e:
+                logger.warning(f"Broadcast flood limit, pausing for {e.retry_after}s")
+                self.limiter.pause(e.retry_after)
+            except TelegramForbiddenError:
+                return BLOCKED
+            except (TelegramNetworkError, TelegramServerError) as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    logger.warning(f"Broadcast to {chat_id} failed after {attempt} attempts: {e}")
+                    return FAILED
+                await asyncio.sleep(2 ** attempt)
+            except Exception as e:
+                logger.warning(f"Broadcast to {chat_id} failed: {e}")
+                return FAILED
+
+    async def _report_progress(self):
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            await self._safe_progress()
+
+    async def _safe_progress(self):
+        try:
+            await self.on_progress(self.stats)
+        except Exception as e:
+            logger.debug(f"Broadcast progress update failed: {e}")
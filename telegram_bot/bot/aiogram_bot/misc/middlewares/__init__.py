@@ -1,3 +1,5 @@
+import asyncio
+
 from aiogram import Dispatcher
 from aiogram.utils.callback_answer import CallbackAnswerMiddleware
 
@@ -7,20 +9,28 @@ from bot.aiogram_bot.misc.middlewares.is_private_middleware import IsPrivateMidd
 from bot.aiogram_bot.misc.middlewares.log_middleware import LogMiddleware
 from bot.aiogram_bot.misc.middlewares.media_middleware import MediaMiddleware
 from bot.aiogram_bot.misc.middlewares.queue_middleware import QueueMessagesMiddleware
+from bot.utils.config import settings
 
 
 def register_middlewares(dp: Dispatcher):
+    # Общий лимит одновременно выполняемых обработчиков сообщений и callback'ов
+    handlers_semaphore = asyncio.Semaphore(settings.QUEUE_MAX_CONCURRENCY)
+
     dp.callback_query.middleware(CallbackAnswerMiddleware())
 
     dp.message.middleware(IsPrivateMiddleware())
     dp.message.middleware(MediaMiddleware())
-    dp.message.middleware(AntiFloodMiddleware())
-    dp.message.middleware(QueueMessagesMiddleware())
+    dp.message.middleware(
+        AntiFloodMiddleware("message", settings.ANTIFLOOD_MESSAGE_RATE, settings.ANTIFLOOD_MESSAGE_BURST)
+    )
+    dp.message.middleware(QueueMessagesMiddleware("message", handlers_semaphore))
     dp.message.middleware(DBMiddleware())
     dp.message.middleware(LogMiddleware())
 
     dp.callback_query.middleware(IsPrivateMiddleware())
-    dp.callback_query.middleware(AntiFloodMiddleware())
-    dp.callback_query.middleware(QueueMessagesMiddleware())
+    dp.callback_query.middleware(
+        AntiFloodMiddleware("callback", settings.ANTIFLOOD_CALLBACK_RATE, settings.ANTIFLOOD_CALLBACK_BURST)
+    )
+    dp.callback_query.middleware(QueueMessagesMiddleware("callback", handlers_semaphore))
     dp.callback_query.middleware(DBMiddleware())
     dp.callback_query.middleware(LogMiddleware())
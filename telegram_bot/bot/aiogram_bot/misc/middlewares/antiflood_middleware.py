@@ -1,15 +1,20 @@
-import datetime
 from typing import Dict, Any, Callable, Awaitable
 
 from aiogram.dispatcher.middlewares.base import BaseMiddleware
 from aiogram.types import Message, TelegramObject, CallbackQuery
 
+from bot.aiogram_bot.misc.rate_limiter import build_limiter
+from bot.utils.config import settings
+
 
 class AntiFloodMiddleware(BaseMiddleware):
-    time_updates: Dict[int, datetime.datetime] = {}
-    message_counts: Dict[int, int] = {}
-    timedelta_limiter: datetime.timedelta = datetime.timedelta(seconds=1)
-    max_messages_per_second: int = 2
+    """Отбрасывает события пользователя сверх `rate` в секунду (со всплеском до `burst`).
+
+    При заданном REDIS_URL лимит общий для всех реплик бота.
+    """
+
+    def __init__(self, scope: str, rate: float, burst: int, max_users: int = settings.ANTIFLOOD_MAX_USERS):
+        self.limiter = build_limiter(scope, rate, burst, max_users)
 
     async def __call__(
             self,
@@ -18,20 +23,7 @@ class AntiFloodMiddleware(BaseMiddleware):
             data: Dict[str, Any],
     ) -> Any:
         if isinstance(event, (Message, CallbackQuery)):
-            user_id = event.from_user.id
-
-            if user_id in self.time_updates.keys():
-                current_time = datetime.datetime.now()
-                if (current_time - self.time_updates[user_id]) > self.timedelta_limiter:
-                    self.message_counts[user_id] = 1
-                    self.time_updates[user_id] = current_time
-                else:
-                    self.message_counts[user_id] += 1
-
-                if self.message_counts[user_id] > self.max_messages_per_second:
-                    return None
-            else:
-                self.message_counts[user_id] = 1
-                self.time_updates[user_id] = datetime.datetime.now()
+            if not await self.limiter.check(event.from_user.id):
+                return None
             data["update_db"] = True
             return await handler(event, data)
@@ -0,0 +1,35 @@
+import logging
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from bot.database.requests.users import mark_user_blocked
+from bot.database.user_cache import user_cache
+
+logger = logging.getLogger(__name__)
+
+
+class BlockedUserRequestMiddleware(BaseRequestMiddleware):
+    """Помечает пользователя заблокировавшим бота при TelegramForbiddenError
+    на любом запросе к Bot API с его chat_id (рассылки, отправка предметов и т.д.)."""
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        try:
+            return await make_request(bot, method)
+        except TelegramForbiddenError:
+            chat_id = getattr(method, "chat_id", None)
+            if isinstance(chat_id, int) and chat_id > 0:
+                user_cache.mark_blocked(chat_id)
+                try:
+                    await mark_user_blocked(chat_id)
+                except Exception as e:
+                    logger.error(f"Failed to mark user {chat_id} as blocked: {e}")
+            raise
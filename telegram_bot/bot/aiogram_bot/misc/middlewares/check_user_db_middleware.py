@@ -3,7 +3,8 @@ from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
 from aiogram.types import Message
 
-from bot.database.requests.users import add_user, update_user
+from bot.database.activity import activity_tracker
+from bot.database.user_cache import user_cache
 
 
 class DBMiddleware(BaseMiddleware):
@@ -15,17 +16,10 @@ class DBMiddleware(BaseMiddleware):
             data: Dict[str, Any]
     ) -> Any:
         if hasattr(event, 'from_user'):
-            user = await add_user(
+            data['user'] = await user_cache.get_user(
                 user_id=event.from_user.id,
                 full_name=event.from_user.full_name,
                 username=event.from_user.username,
             )
-
-            if user.full_name != event.from_user.full_name or user.username != event.from_user.username:
-                await update_user(
-                    user_id=event.from_user.id,
-                    full_name=event.from_user.full_name,
-                    username=event.from_user.username,
-                )
-            data['user'] = user
+            activity_tracker.touch(event.from_user.id)
         return await handler(event, data)
@@ -1,13 +1,42 @@
 import logging
+import random
 from typing import Callable, Dict, Any, Awaitable
 
 from aiogram import BaseMiddleware
 from aiogram import types
 
+from bot.aiogram_bot.misc.rate_limiter import TokenBucketLimiter
+from bot.utils.config import settings
+
 logger = logging.getLogger(__name__)
 
+SAMPLE_RATES = {
+    "Message": settings.LOG_SAMPLE_MESSAGE,
+    "CallbackQuery": settings.LOG_SAMPLE_CALLBACK,
+}
+
+# Общий для сообщений и callback'ов лимит записей на пользователя
+user_log_limiter = TokenBucketLimiter(
+    rate=settings.LOG_USER_RATE_PER_MINUTE / 60,
+    burst=settings.LOG_USER_RATE_PER_MINUTE,
+    max_size=settings.ANTIFLOOD_MAX_USERS,
+)
+
 
 class LogMiddleware(BaseMiddleware):
+    """Структурированный лог апдейтов с выборкой.
+
+    Апдейты логируются с вероятностью из SAMPLE_RATES и не чаще
+    LOG_USER_RATE_PER_MINUTE в минуту на пользователя. Апдейты админов и
+    пользователей из LOG_DEBUG_USER_IDS логируются всегда, а апдейт,
+    обработка которого упала, — на уровне ERROR с traceback независимо от
+    выборки. Записанное исключение помечается (см. is_logged), чтобы
+    обработчик очереди не логировал его повторно.
+    """
+
+    def __init__(self):
+        self.always_log = set(settings.ADMIN_IDS) | set(settings.LOG_DEBUG_USER_IDS)
+
     async def __call__(
             self,
             handler: Callable[[types.TelegramObject, Dict[str, Any]], Awaitable[Any]],
@@ -15,8 +44,49 @@ class LogMiddleware(BaseMiddleware):
             data: Dict[str, Any]
     ) -> Any:
         event_type = type(event).__name__
+        user_id = event.from_user.id
+
+        logged = self.should_log(event_type, user_id)
+        if logged:
+            self.log_update(logging.INFO, event_type, event)
+
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            if self.log_update(logging.ERROR, event_type, event, failed=True):
+                e._update_logged = True
+            raise
+
+    def should_log(self, event_type: str, user_id: int) -> bool:
+        if user_id in self.always_log:
+            return True
+        if random.random() >= SAMPLE_RATES.get(event_type, 1.0):
+            return False
+        return user_log_limiter.allow(user_id)
+
+    def log_update(self, level: int, event_type: str, event: types.TelegramObject, failed: bool = False) -> bool:
+        if not logger.isEnabledFor(level):
+            return False
         event_data = event.text if isinstance(event, types.Message) else event.data
-        logger.info(
-            f"{event_type}: {event_data} FROM {event.from_user.id} ({event.from_user.username} | {event.from_user.full_name})")
+        if event_data and len(event_data) > settings.LOG_TEXT_LIMIT:
+            event_data = event_data[:settings.LOG_TEXT_LIMIT] + "…"
+        fields = {
+            "event": event_type,
+            "user_id": event.from_user.id,
+            "username": event.from_user.username,
+            "data": event_data,
+        }
+        if isinstance(event, types.Message) and event.content_type != "text":
+            fields["content_type"] = event.content_type
+        if failed:
+            fields["failed"] = True
+        logger.log(
+            level, "%s FROM %s: %s", event_type, event.from_user.id, event_data,
+            exc_info=failed, extra={"fields": fields},
+        )
+        return True
+
 
-        return await handler(event, data)
+def is_logged(exc: BaseException) -> bool:
+    """Исключение уже записано LogMiddleware вместе с апдейтом."""
+    return getattr(exc, "_update_logged", False)
@@ -1,15 +1,48 @@
 import asyncio
-from typing import Callable, Any, Awaitable, Union, Dict
+import time
+from collections import OrderedDict
+from typing import Callable, Any, Awaitable, Dict
 
 from aiogram import BaseMiddleware
 from aiogram.types import Message
 
+from bot.utils.config import settings
+
+# Больше частей в альбоме Telegram не бывает
+MAX_ALBUM_SIZE = 10
+
+
+class AlbumGroup:
+    __slots__ = ("messages", "started_at", "timer", "done")
+
+    def __init__(self, message: Message):
+        self.messages = [message]
+        self.started_at = time.monotonic()
+        self.timer: asyncio.TimerHandle | None = None
+        self.done = asyncio.get_running_loop().create_future()
+
 
 class MediaMiddleware(BaseMiddleware):
-    album_data: dict = {}
+    """Собирает части альбома (media group) в один вызов обработчика.
+
+    Альбом считается собранным, когда `delay` секунд не приходит новых частей;
+    каждая новая часть перезапускает таймер, но не дольше `max_wait` секунд
+    от первой части. Обработчик вызывается один раз — с первой частью альбома
+    и списком всех частей по порядку message_id в data["album"]. Одновременно
+    собирается не больше `max_groups` альбомов: при переполнении самый старый
+    отдаётся в обработку досрочно.
+    """
 
-    def __init__(self, latency: Union[int, float] = 0.01):
-        self.latency = latency
+    def __init__(
+            self,
+            delay: float = settings.ALBUM_DELAY,
+            max_wait: float = settings.ALBUM_MAX_WAIT,
+            max_groups: int = settings.ALBUM_MAX_GROUPS,
+    ):
+        self.delay = delay
+        self.max_wait = max_wait
+        self.max_groups = max_groups
+        self.album_data: OrderedDict[str, AlbumGroup] = OrderedDict()
 
     async def __call__(
             self,
@@ -18,18 +51,40 @@ class MediaMiddleware(BaseMiddleware):
             data: Dict[str, Any]
     ) -> Any:
         if not message.media_group_id:
-            await handler(message, data)
+            return await handler(message, data)
+
+        group = self.album_data.get(message.media_group_id)
+        if group is not None:
+            group.messages.append(message)
+            self._schedule(message.media_group_id, group)
+            return
+
+        group = self.album_data[message.media_group_id] = AlbumGroup(message)
+        while len(self.album_data) > self.max_groups:
+            media_group_id, oldest = next(iter(self.album_data.items()))
+            self._finish(media_group_id, oldest)
+        self._schedule(message.media_group_id, group)
+
+        await group.done
+        album = sorted(group.messages, key=lambda m: m.message_id)
+        data["album"] = album
+        return await handler(album[0], data)
+
+    def _schedule(self, media_group_id: str, group: AlbumGroup):
+        if group.timer is not None:
+            group.timer.cancel()
+        if len(group.messages) >= MAX_ALBUM_SIZE:
+            self._finish(media_group_id, group)
             return
-        try:
-            self.album_data[message.media_group_id].append(message)
-        except KeyError:
-            self.album_data[message.media_group_id] = [message]
-            await asyncio.sleep(self.latency)
-
-            data['_is_last'] = True
-            data["album"] = self.album_data[message.media_group_id]
-            await handler(message, data)
-
-        if message.media_group_id and data.get("_is_last"):
-            del self.album_data[message.media_group_id]
-            del data['_is_last']
+        remaining = group.started_at + self.max_wait - time.monotonic()
+        loop = asyncio.get_running_loop()
+        group.timer = loop.call_later(max(0.0, min(self.delay, remaining)), self._finish, media_group_id, group)
+
+    def _finish(self, media_group_id: str, group: AlbumGroup):
+        if group.timer is not None:
+            group.timer.cancel()
+            group.timer = None
+        if self.album_data.get(media_group_id) is group:
+            del self.album_data[media_group_id]
+        if not group.done.done():
+            group.done.set_result(None)
@@ -1,18 +1,60 @@
 import asyncio
-import traceback
-from collections import defaultdict
+import logging
+import time
+from collections import deque
 from typing import Dict, Any, Callable, Awaitable
 
 from aiogram.dispatcher.middlewares.base import BaseMiddleware
 from aiogram.types import Message, TelegramObject, CallbackQuery
 
+from bot.aiogram_bot.misc.middlewares.log_middleware import is_logged
+from bot.utils.config import settings
+from bot.utils.metrics import metrics
 
-class QueueMessagesMiddleware(BaseMiddleware):
+logger = logging.getLogger(__name__)
+
+
+class UserQueue:
+    __slots__ = ("events", "ready", "worker")
 
     def __init__(self):
+        # (событие, обработчик, data, время постановки в очередь)
+        self.events: deque[tuple[TelegramObject, Callable, Dict[str, Any], float]] = deque()
+        self.ready = asyncio.Event()
+        self.worker: asyncio.Task | None = None
+
+
+class QueueMessagesMiddleware(BaseMiddleware):
+    """Последовательная обработка событий каждого пользователя.
+
+    Обработчик очереди пользователя завершается после `idle_timeout` секунд
+    без событий и создаётся заново при следующем. Очередь ограничена
+    `max_size` событиями: новый callback от того же сообщения заменяет
+    ожидающий, при переполнении сначала отбрасываются callback'и.
+    `semaphore` ограничивает число одновременно выполняемых обработчиков
+    (общий для всех экземпляров middleware).
+
+    Время ожидания в очереди и выполнения обработчика пишется в гистограммы
+    queue_wait / queue_exec, глубина очередей и число обработчиков — в
+    метрики queue_depth / queue_workers.
+    """
+
+    instances: list["QueueMessagesMiddleware"] = []
+
+    def __init__(
+            self,
+            name: str,
+            semaphore: asyncio.Semaphore,
+            idle_timeout: float = settings.QUEUE_IDLE_TIMEOUT,
+            max_size: int = settings.QUEUE_MAX_SIZE,
+    ):
         super().__init__()
-        self.user_queues = defaultdict(asyncio.Queue)
-        self.user_tasks = {}
+        self.name = name
+        self.semaphore = semaphore
+        self.idle_timeout = idle_timeout
+        self.max_size = max_size
+        self.user_queues: dict[int, UserQueue] = {}
+        QueueMessagesMiddleware.instances.append(self)
 
     async def __call__(
             self,
@@ -23,18 +65,86 @@ class QueueMessagesMiddleware(BaseMiddleware):
         if isinstance(event, (Message, CallbackQuery)):
             user_id = event.from_user.id
 
-            if user_id not in self.user_tasks:
-                self.user_tasks[user_id] = asyncio.create_task(self.process_queue(user_id, handler, data))
+            queue = self.user_queues.get(user_id)
+            if queue is None:
+                queue = self.user_queues[user_id] = UserQueue()
+                queue.worker = asyncio.create_task(self.process_queue(user_id, queue))
+
+            self.enqueue(queue, (event, handler, data, time.monotonic()))
+
+    def enqueue(self, queue: UserQueue, item: tuple[TelegramObject, Callable, Dict[str, Any], float]):
+        event = item[0]
+        if isinstance(event, CallbackQuery) and event.message:
+            # Нажатие на кнопку того же сообщения делает ожидающее устаревшим
+            stale = [queued for queued in queue.events if _same_message_callback(queued[0], event)]
+            for queued in stale:
+                queue.events.remove(queued)
+
+        if len(queue.events) >= self.max_size:
+            callback = next((queued for queued in queue.events if isinstance(queued[0], CallbackQuery)), None)
+            if callback is None:
+                logger.warning(f"Queue of user {event.from_user.id} is full, update dropped")
+                return
+            queue.events.remove(callback)
+
+        queue.events.append(item)
+        queue.ready.set()
+
+    async def process_queue(self, user_id: int, queue: UserQueue):
+        try:
+            while True:
+                if not queue.events:
+                    queue.ready.clear()
+                    try:
+                        async with asyncio.timeout(self.idle_timeout):
+                            await queue.ready.wait()
+                    except TimeoutError:
+                        if not queue.events:
+                            return
+                    continue
+
+                event, handler, data, enqueued_at = queue.events.popleft()
+                async with self.semaphore:
+                    started_at = time.monotonic()
+                    wait_histogram.observe(started_at - enqueued_at)
+                    try:
+                        await handler(event, data)
+                    except Exception as e:
+                        if not is_logged(e):
+                            logger.exception(f"Handler failed for {self.name} from user {user_id}")
+                    finally:
+                        exec_histogram.observe(time.monotonic() - started_at)
+        finally:
+            if self.user_queues.get(user_id) is queue:
+                del self.user_queues[user_id]
+
+
+wait_histogram = metrics.histogram("queue_wait")
+exec_histogram = metrics.histogram("queue_exec")
+metrics.gauge("queue_depth", lambda: sum(
+    len(queue.events) for middleware in QueueMessagesMiddleware.instances for queue in middleware.user_queues.values()
+))
+metrics.gauge("queue_workers", lambda: sum(
+    len(middleware.user_queues) for middleware in QueueMessagesMiddleware.instances
+))
+
 
-            await self.user_queues[user_id].put((event, handler, data))
+def get_deepest_queues(limit: int) -> list[tuple[str, int, int, float]]:
+    """Самые длинные очереди: (тип событий, user_id, глубина, ожидание старейшего события в секундах)."""
+    now = time.monotonic()
+    queues = [
+        (middleware.name, user_id, len(queue.events), now - queue.events[0][3])
+        for middleware in QueueMessagesMiddleware.instances
+        for user_id, queue in middleware.user_queues.items()
+        if queue.events
+    ]
+    queues.sort(key=lambda row: (row[2], row[3]), reverse=True)
+    return queues[:limit]
 
-    async def process_queue(self, user_id: int, handler: Callable, data: Dict[str, Any]):
-        while True:
-            event, handler, data = await self.user_queues[user_id].get()
-            try:
-                await handler(event, data)
-            except Exception as e:
-                error_text = "".join((traceback.format_exception(None, e, e.__traceback__)))
-                print(error_text)
 
-            self.user_queues[user_id].task_done()
+def _same_message_callback(queued: TelegramObject, event: CallbackQuery) -> bool:
+    return (
+        isinstance(queued, CallbackQuery) and queued.message is not None
+        and queued.message.chat.id == event.message.chat.id
+        and queued.message.message_id == event.message.message_id
+    )
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from bot.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucketLimiter:
+    """Token bucket на пользователя: `rate` событий в секунду, всплеск до `burst`.
+
+    Время — `time.monotonic()`, переводы системных часов не влияют на лимит.
+    Корзина, простоявшая дольше времени полного пополнения, ничем не отличается
+    от новой и удаляется; при превышении `max_size` вытесняются давно не
+    использованные, так что память ограничена при любом числе пользователей.
+    """
+
+    def __init__(self, rate: float, burst: int, max_size: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_size = max_size
+        self.ttl = burst / rate
+        # ключ -> (токены, время последнего обращения)
+        self._buckets: OrderedDict[int, tuple[float, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def allow(self, key: int) -> bool:
+        now = time.monotonic()
+        self._expire(now)
+
+        bucket = self._buckets.pop(key, None)
+        if bucket is None:
+            tokens = float(self.burst)
+        else:
+            tokens, updated_at = bucket
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_size:
+            self._buckets.popitem(last=False)
+        return allowed
+
+    def _expire(self, now: float):
+        # Порядок словаря — по времени последнего обращения, просроченные в начале
+        while self._buckets:
+            key, (_, updated_at) = next(iter(self._buckets.items()))
+            if now - updated_at < self.ttl:
+                return
+            del self._buckets[key]
+
+    def is_idle(self, key: int) -> bool:
+        """Корзина полна: за время полного пополнения событий от `key` не было."""
+        bucket = self._buckets.get(key)
+        return bucket is None or time.monotonic() - bucket[1] >= self.ttl
+
+    async def check(self, key: int) -> bool:
+        return self.allow(key)
+
+
+# Token bucket в хеше Redis; время берётся у сервера Redis, одно для всех реплик
+_TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return allowed
+"""
+
+
+class RedisTokenBucketLimiter:
+    """Общий для всех реплик token bucket в Redis с локальной быстрой проверкой.
+
+    Сначала событие проходит через локальный лимитер: если уже он отказывает,
+    Redis не нужен. Если от пользователя давно не было событий на этой реплике,
+    событие пропускается сразу, а токен списывается в Redis в фоне. Ожидание
+    ответа Redis достаётся только пользователям, пишущим часто. Отказ Redis
+    запоминается локально на время пополнения одного токена, так что следующие
+    события пользователя отклоняются без обращения к Redis, в том числе после
+    фоновой проверки. При недоступности Redis событие пропускается.
+    """
+
+    def __init__(self, redis_url: str, scope: str, rate: float, burst: int, max_size: int):
+        from redis.asyncio import Redis
+
+        self.scope = scope
+        self.rate = rate
+        self.burst = burst
+        self.local = TokenBucketLimiter(rate, burst, max_size)
+        self.redis = Redis.from_url(redis_url)
+        self._script = self.redis.register_script(_TOKEN_BUCKET)
+        self._background: set[asyncio.Task] = set()
+        # ключ -> момент, до которого события отклоняются по ответу Redis
+        self._denied_until: OrderedDict[int, float] = OrderedDict()
+
+    async def check(self, key: int) -> bool:
+        if self._is_denied(key):
+            return False
+        idle = self.local.is_idle(key)
+        if not self.local.allow(key):
+            return False
+        if idle:
+            task = asyncio.create_task(self._consume(key))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+            return True
+        return await self._consume(key)
+
+    async def _consume(self, key: int) -> bool:
+        try:
+            allowed = await self._script(keys=[f"antiflood:{self.scope}:{key}"], args=[self.rate, self.burst])
+        except Exception as e:
+            logger.warning(f"Redis anti-flood check failed, allowing update: {e}")
+            return True
+        if not allowed:
+            self._deny(key)
+        return bool(allowed)
+
+    def _deny(self, key: int):
+        self._denied_until.pop(key, None)
+        self._denied_until[key] = time.monotonic() + 1 / self.rate
+        if len(self._denied_until) > self.local.max_size:
+            self._denied_until.popitem(last=False)
+
+    def _is_denied(self, key: int) -> bool:
+        now = time.monotonic()
+        # Срок отказа у всех ключей одинаковый, поэтому истёкшие — в начале словаря
+        while self._denied_until:
+            denied_until = next(iter(self._denied_until.values()))
+            if denied_until > now:
+                break
+            self._denied_until.popitem(last=False)
+        return key in self._denied_until
+
+
+def build_limiter(scope: str, rate: float, burst: int, max_size: int):
+    """Распределённый лимитер при заданном REDIS_URL, иначе локальный."""
+    if settings.REDIS_URL:
+        return RedisTokenBucketLimiter(settings.REDIS_URL, scope, rate, burst, max_size)
+    return TokenBucketLimiter(rate, burst, max_size)
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from bot.database.requests.users import update_last_activity
+from bot.utils.config import settings
+from bot.utils.periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityTracker:
+    """Копит время последней активности пользователей в памяти.
+
+    Раз в `flush_interval` секунд накопленное записывается в users.last_activity
+    пакетами по `batch_size` пользователей — один UPDATE на пакет вместо
+    запроса на каждый апдейт.
+    """
+
+    def __init__(self, flush_interval: float, batch_size: int):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending: dict[int, datetime] = {}
+        self._flusher = PeriodicTask("User activity flush", self.flush, flush_interval)
+        self._lock = asyncio.Lock()
+
+    def touch(self, user_id: int):
+        self._pending[user_id] = datetime.now(timezone.utc)
+
+    def start(self):
+        self._flusher.start()
+
+    async def stop(self):
+        # Прерванный flush успевает вернуть свой пакет в буфер до финальной записи
+        await self._flusher.stop()
+        await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            rows = list(pending.items())
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start:start + self.batch_size]
+                try:
+                    await update_last_activity(dict(batch))
+                except BaseException:
+                    # Вернуть незаписанное в буфер (в том числе при отмене),
+                    # не затирая более свежие отметки
+                    for user_id, seen_at in rows[start:]:
+                        self._pending[user_id] = max(seen_at, self._pending.get(user_id, seen_at))
+                    raise
+
+
+activity_tracker = ActivityTracker(settings.ACTIVITY_FLUSH_INTERVAL, settings.ACTIVITY_BATCH_SIZE)
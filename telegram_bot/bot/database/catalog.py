@@ -0,0 +1,199 @@
+import logging
+from typing import Callable, Iterable
+
+from sqlalchemy import select
+
+from bot.database.models import async_session, Category, Item
+
+logger = logging.getLogger(__name__)
+
+
+def _sort_key(element) -> tuple[int, int]:
+    return element.sort_order, element.id
+
+
+class CatalogSnapshot:
+    """Снимок всех категорий и предметов в памяти процесса.
+
+    Загружается один раз при старте и поддерживается в актуальном состоянии
+    функциями записи из `database/requests/products.py`, поэтому навигация
+    пользователя не обращается к БД.
+
+    Подписчики (`add_listener`) получают множество id категорий, чьё
+    содержимое изменилось, или None, если снимок перестроен целиком.
+    """
+
+    def __init__(self):
+        self.categories: dict[int, Category] = {}
+        self.items: dict[int, Item] = {}
+        self.children: dict[int | None, list[Category]] = {}
+        self.category_items: dict[int, list[Item]] = {}
+        self.loaded = False
+        self._listeners: list[Callable[[set[int | None] | None], None]] = []
+
+    def add_listener(self, listener: Callable[[set[int | None] | None], None]):
+        self._listeners.append(listener)
+
+    def _notify(self, category_ids: Iterable[int | None] | None):
+        touched = set(category_ids) if category_ids is not None else None
+        for listener in self._listeners:
+            try:
+                listener(touched)
+            except Exception as e:
+                logger.exception(f"Catalog listener failed: {e}")
+
+    async def load(self):
+        async with async_session() as session:
+            categories = (await session.scalars(select(Category))).all()
+            items = (await session.scalars(select(Item))).all()
+        self.rebuild(categories, items)
+        logger.info(f"Catalog snapshot loaded: {len(self.categories)} categories, {len(self.items)} items")
+
+    def rebuild(self, categories, items, touched: set[int | None] | None = None):
+        self.categories = {cat.id: cat for cat in categories}
+        self.items = {item.id: item for item in items}
+        self.children = {}
+        self.category_items = {}
+        for cat in categories:
+            self.children.setdefault(cat.parent_id, []).append(cat)
+        for item in items:
+            self.category_items.setdefault(item.category_id, []).append(item)
+        for siblings in self.children.values():
+            siblings.sort(key=_sort_key)
+        for siblings in self.category_items.values():
+            siblings.sort(key=_sort_key)
+        self.loaded = True
+        self._notify(touched)
+
+    def apply_delta(self, touched: set[int | None], categories, items):
+        """Заменяет категории из `touched` и их предметы присланными значениями.
+
+        `categories` — существующие категории из `touched`, `items` — все
+        предметы этих категорий; отсутствующие в них считаются удалёнными.
+        """
+        for category_id in touched:
+            old = self.categories.pop(category_id, None)
+            if old is not None:
+                self._detach(self.children, old.parent_id, category_id)
+            for item in self.category_items.pop(category_id, []):
+                self.items.pop(item.id, None)
+        for category in categories:
+            self.categories[category.id] = category
+            self._attach(self.children, category.parent_id, category)
+        for item in items:
+            old = self.items.get(item.id)
+            if old is not None:
+                self._detach(self.category_items, old.category_id, old.id)
+            self.items[item.id] = item
+            self._attach(self.category_items, item.category_id, item)
+        self._notify(touched)
+
+    # ── Чтение ───────────────────────────────────────────────────────────────
+
+    def get_category(self, category_id: int | None) -> Category | None:
+        return self.categories.get(category_id)
+
+    def get_children(self, parent_id: int | None) -> list[Category]:
+        return self.children.get(parent_id, [])
+
+    def get_item(self, item_id: int) -> Item | None:
+        return self.items.get(item_id)
+
+    def get_items(self, category_id: int | None) -> list[Item]:
+        return self.category_items.get(category_id, [])
+
+    # ── Изменение категорий ──────────────────────────────────────────────────
+
+    def put_category(self, category: Category):
+        touched = {category.id, category.parent_id}
+        old = self.categories.get(category.id)
+        if old is not None:
+            self._detach(self.children, old.parent_id, old.id)
+            touched.add(old.parent_id)
+        self.categories[category.id] = category
+        self._attach(self.children, category.parent_id, category)
+        self._notify(touched)
+
+    def patch_category(self, category_id: int, **values):
+        category = self.categories.get(category_id)
+        if category is None:
+            return
+        old_parent_id = category.parent_id
+        for key, value in values.items():
+            setattr(category, key, value)
+        if category.parent_id != old_parent_id:
+            self._detach(self.children, old_parent_id, category_id)
+            self._attach(self.children, category.parent_id, category)
+        else:
+            self.children.get(category.parent_id, []).sort(key=_sort_key)
+        self._notify({category_id, old_parent_id, category.parent_id})
+
+    def remove_category(self, category_id: int):
+        """Удаляет категорию вместе с поддеревом и предметами (как cascade в модели)."""
+        category = self.categories.get(category_id)
+        if category is None:
+            return
+        removed = self._remove_subtree(category_id)
+        self._detach(self.children, category.parent_id, category_id)
+        self._notify(removed | {category.parent_id})
+
+    def _remove_subtree(self, category_id: int) -> set[int]:
+        removed = {category_id}
+        self.categories.pop(category_id, None)
+        for child in self.children.pop(category_id, []):
+            removed |= self._remove_subtree(child.id)
+        for item in self.category_items.pop(category_id, []):
+            self.items.pop(item.id, None)
+        return removed
+
+    # ── Изменение предметов ──────────────────────────────────────────────────
+
+    def put_item(self, item: Item):
+        touched = {item.category_id}
+        old = self.items.get(item.id)
+        if old is not None:
+            self._detach(self.category_items, old.category_id, old.id)
+            touched.add(old.category_id)
+        self.items[item.id] = item
+        self._attach(self.category_items, item.category_id, item)
+        self._notify(touched)
+
+    def patch_item(self, item_id: int, **values):
+        item = self.items.get(item_id)
+        if item is None:
+            return
+        old_category_id = item.category_id
+        for key, value in values.items():
+            setattr(item, key, value)
+        if item.category_id != old_category_id:
+            self._detach(self.category_items, old_category_id, item_id)
+            self._attach(self.category_items, item.category_id, item)
+        else:
+            self.category_items.get(item.category_id, []).sort(key=_sort_key)
+        self._notify({old_category_id, item.category_id})
+
+    def remove_item(self, item_id: int):
+        item = self.items.pop(item_id, None)
+        if item is not None:
+            self._detach(self.category_items, item.category_id, item_id)
+            self._notify({item.category_id})
+
+    # ── Индексы ──────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _attach(index: dict, key, element):
+        siblings = index.setdefault(key, [])
+        siblings.append(element)
+        siblings.sort(key=_sort_key)
+
+    @staticmethod
+    def _detach(index: dict, key, element_id: int):
+        siblings = index.get(key)
+        if not siblings:
+            return
+        siblings[:] = [e for e in siblings if e.id != element_id]
+        if not siblings:
+            del index[key]
+
+
+catalog = CatalogSnapshot()
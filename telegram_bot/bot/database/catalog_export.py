@@ -0,0 +1,103 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from bot.database.catalog import catalog
+from bot.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def build_catalog_structure() -> dict:
+    """Дерево каталога в формате categories.json, собранное из снимка в памяти."""
+
+    def items_data(category_id: int) -> list[dict]:
+        return [{
+            "name": item.name, "description": item.description,
+            "content_type": item.content_type, "file_id": item.file_id,
+            "file_path": item.file_path, "sort_order": item.sort_order
+        } for item in catalog.get_items(category_id)]
+
+    def build_tree(parent_id: int | None) -> dict:
+        tree = {}
+        for child in catalog.get_children(parent_id):
+            tree[child.name] = {
+                "prompt_text": child.prompt_text, "sort_order": child.sort_order,
+                "items": items_data(child.id), "subcategories": build_tree(child.id)
+            }
+        return tree
+
+    return build_tree(None)
+
+
+def write_json_atomic(file_path: str, data: dict):
+    """Пишет JSON во временный файл рядом с целевым и подменяет его через rename.
+
+    Для атомарности файл должен лежать в смонтированной директории, а не быть
+    смонтирован сам (см. CATALOG_EXPORT_PATH в docker-compose.yml). Если rename
+    всё же невозможен, содержимое копируется поверх целевого файла.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".categories-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.replace(tmp_path, file_path)
+        except OSError as e:
+            logger.warning(f"Atomic replace of {file_path} failed ({e}), copying in place")
+            shutil.copyfile(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class CatalogExporter:
+    """Отложенная выгрузка каталога в categories.json.
+
+    Серия изменений каталога схлопывается в одну запись после `delay` секунд
+    тишины; сериализация и запись выполняются в отдельном потоке.
+    """
+
+    def __init__(self, file_path: str, delay: float):
+        self.file_path = file_path
+        self.delay = delay
+        self._timer: asyncio.TimerHandle | None = None
+        self._task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+
+    def schedule(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        loop = asyncio.get_running_loop()
+        self._timer = loop.call_later(self.delay, self._fire)
+
+    def _fire(self):
+        self._timer = None
+        self._task = asyncio.create_task(self.export())
+
+    async def export(self):
+        async with self._lock:
+            structure = build_catalog_structure()
+            try:
+                await asyncio.to_thread(write_json_atomic, self.file_path, structure)
+            except Exception as e:
+                logger.error(f"Error exporting categories to JSON: {e}")
+
+    async def flush(self):
+        """Немедленно выполнить отложенную выгрузку (при остановке бота)."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+            await self.export()
+        if self._task is not None and not self._task.done():
+            await self._task
+
+
+catalog_exporter = CatalogExporter(settings.CATALOG_EXPORT_PATH, settings.CATALOG_EXPORT_DELAY)
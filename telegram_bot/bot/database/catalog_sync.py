@@ -0,0 +1,203 @@
+import asyncio
+import contextlib
+import json
+import logging
+import uuid
+
+from sqlalchemy import select
+
+from bot.database.catalog import catalog
+from bot.database.models import async_session, Category, Item
+from bot.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = "catalog:snapshot"
+SNAPSHOT_GENERATION_KEY = "catalog:snapshot:generation"
+GENERATION_KEY = "catalog:generation"
+CHANNEL = "catalog:invalidate"
+
+CATEGORY_FIELDS = ("id", "name", "prompt_text", "sort_order", "parent_id")
+ITEM_FIELDS = ("id", "name", "description", "content_type", "sort_order", "file_id", "file_path", "category_id")
+
+# Записываем снимок, только если он новее уже сохранённого.
+_STORE_IF_NEWER = """
+local current = redis.call('GET', KEYS[2])
+if current and tonumber(current) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2])
+redis.call('SET', KEYS[2], ARGV[1])
+return 1
+"""
+
+
+def _rows(categories, items) -> dict:
+    return {
+        "categories": [{f: getattr(c, f) for f in CATEGORY_FIELDS} for c in categories],
+        "items": [{f: getattr(i, f) for f in ITEM_FIELDS} for i in items],
+    }
+
+
+def _objects(data: dict) -> tuple[list[Category], list[Item]]:
+    return [Category(**c) for c in data["categories"]], [Item(**i) for i in data["items"]]
+
+
+def serialize_catalog(categories, items, generation: int) -> str:
+    return json.dumps({"generation": generation, **_rows(categories, items)}, ensure_ascii=False)
+
+
+def deserialize_catalog(raw: str | bytes) -> tuple[int, list[Category], list[Item]]:
+    data = json.loads(raw)
+    return data["generation"], *_objects(data)
+
+
+class CatalogSync:
+    """Общий для всех реплик кеш каталога в Redis.
+
+    Снимок каталога хранится в Redis вместе с номером поколения. При старте
+    реплика строит снимок из Postgres и публикует его. После изменения каталога
+    реплика сохраняет в Redis свой уже обновлённый локальный снимок и публикует
+    сообщение с затронутыми категориями и их предметами; остальные реплики
+    применяют это изменение к своим снимкам. Полный снимок из Redis загружается,
+    только если реплика пропустила поколение. Без `REDIS_URL` работает как
+    обычная локальная загрузка из БД.
+    """
+
+    def __init__(self, redis_url: str | None):
+        self.redis_url = redis_url
+        self.redis = None
+        self.replica_id = uuid.uuid4().hex
+        self.generation = 0
+        self._pending: set[int | None] = set()
+        self._pending_all = False
+        self._publish_task: asyncio.Task | None = None
+        self._listen_task: asyncio.Task | None = None
+        self._applying = False
+
+    async def start(self):
+        if not self.redis_url:
+            await catalog.load()
+            return
+
+        from redis.asyncio import Redis
+
+        self.redis = Redis.from_url(self.redis_url)
+        self._store_if_newer = self.redis.register_script(_STORE_IF_NEWER)
+
+        # Снимок в Redis мог пережить сброс БД или отстать от правок, сделанных
+        # при инициализации, поэтому при старте источник истины — Postgres
+        await self._publish(None, rebuild=True)
+
+        catalog.add_listener(self._on_catalog_changed)
+        self._listen_task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listen_task and not self._listen_task.done():
+            self._listen_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._listen_task
+        # Последние изменения каталога должны попасть в Redis до остановки
+        if self._publish_task is not None:
+            await self._publish_task
+        if self.redis is not None:
+            await self.redis.aclose()
+            self.redis = None
+
+    def _on_catalog_changed(self, category_ids: set[int | None] | None):
+        if self._applying:
+            return
+        if category_ids is None:
+            self._pending_all = True
+        else:
+            self._pending |= category_ids
+        if self._publish_task is None or self._publish_task.done():
+            self._publish_task = asyncio.create_task(self._drain())
+
+    async def _drain(self):
+        while self._pending or self._pending_all:
+            touched = None if self._pending_all else self._pending
+            self._pending, self._pending_all = set(), False
+            try:
+                await self._publish(touched)
+            except Exception as e:
+                logger.exception(f"Failed to publish catalog invalidation: {e}")
+
+    async def _publish(self, touched: set[int | None] | None, rebuild: bool = False):
+        generation = await self.redis.incr(GENERATION_KEY)
+        if rebuild or (generation > self.generation + 1 and catalog.loaded):
+            # Пропущены изменения других реплик — берём свежие данные из БД
+            async with async_session() as session:
+                categories = (await session.scalars(select(Category))).all()
+                items = (await session.scalars(select(Item))).all()
+            self._applying = True
+            try:
+                catalog.rebuild(categories, items, None)
+            finally:
+                self._applying = False
+        else:
+            categories, items = list(catalog.categories.values()), list(catalog.items.values())
+        raw = serialize_catalog(categories, items, generation)
+        await self._store_if_newer(keys=[SNAPSHOT_KEY, SNAPSHOT_GENERATION_KEY], args=[generation, raw])
+        self.generation = max(self.generation, generation)
+
+        payload = {"generation": generation, "origin": self.replica_id, "category_ids": None}
+        if touched is not None:
+            payload["category_ids"] = list(touched)
+            payload["delta"] = _rows(
+                [catalog.categories[c] for c in touched if c in catalog.categories],
+                [item for c in touched for item in catalog.get_items(c)],
+            )
+        await self.redis.publish(CHANNEL, json.dumps(payload, ensure_ascii=False))
+
+    async def _load_from_redis(self, touched: set[int | None] | None = None) -> bool:
+        raw = await self.redis.get(SNAPSHOT_KEY)
+        if raw is None:
+            return False
+        generation, categories, items = deserialize_catalog(raw)
+        if generation <= self.generation and catalog.loaded:
+            return True
+        self._applying = True
+        try:
+            catalog.rebuild(categories, items, touched)
+        finally:
+            self._applying = False
+        self.generation = generation
+        logger.info(f"Catalog snapshot generation {generation} loaded from Redis")
+        return True
+
+    async def _listen(self):
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(CHANNEL)
+                    await self._load_from_redis()
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        await self._on_message(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Catalog invalidation listener failed, reconnecting: {e}")
+                await asyncio.sleep(1)
+
+    async def _on_message(self, payload: dict):
+        generation = payload["generation"]
+        if payload["origin"] == self.replica_id or generation <= self.generation:
+            self.generation = max(self.generation, generation)
+            return
+        category_ids = payload.get("category_ids")
+        touched = set(category_ids) if category_ids is not None else None
+        if touched is not None and "delta" in payload and generation == self.generation + 1 and catalog.loaded:
+            self._applying = True
+            try:
+                catalog.apply_delta(touched, *_objects(payload["delta"]))
+            finally:
+                self._applying = False
+            self.generation = generation
+            return
+        await self._load_from_redis(touched)
+
+
+catalog_sync = CatalogSync(settings.REDIS_URL)
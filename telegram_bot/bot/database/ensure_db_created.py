@@ -19,6 +19,10 @@ def create_database(dbname, user, password, host="localhost", port="5432"):
 
         cursor = connection.cursor()
 
+        cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (dbname,))
+        if cursor.fetchone():
+            return
+
         create_db_query = sql.SQL("CREATE DATABASE {}").format(sql.Identifier(dbname))
         cursor.execute(create_db_query)
     except psycopg2.Error as e:
@@ -6,6 +6,7 @@ import shutil
 from sqlalchemy import select
 
 from bot.database.models import Category, Item, async_session
+from bot.utils.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -14,13 +15,13 @@ async def create_initial_categories():
     async with async_session() as session:
         result = await session.execute(select(Category).limit(1))
         if result.scalar() is None:
-            logger.info("Категорий не найдено... создаем из categories.json")
+            logger.info(f"Категорий не найдено... создаем из {settings.CATALOG_EXPORT_PATH}")
 
             try:
-                with open("categories.json", "r", encoding="utf-8") as f:
+                with open(settings.CATALOG_EXPORT_PATH, "r", encoding="utf-8") as f:
                     initial_structure = json.load(f)
             except FileNotFoundError:
-                logger.warning("Файл categories.json не найден!")
+                logger.warning(f"Файл {settings.CATALOG_EXPORT_PATH} не найден!")
                 initial_structure = {}
             except json.JSONDecodeError:
                 logger.warning("Ошибка чтения JSON!")
@@ -99,10 +100,10 @@ async def sync_init_files():
     logger.info("Checking for missing init_files...")
     async with async_session() as session:
         try:
-            with open("categories.json", "r", encoding="utf-8") as f:
+            with open(settings.CATALOG_EXPORT_PATH, "r", encoding="utf-8") as f:
                 initial_structure = json.load(f)
         except Exception as e:
-            logger.info(f"Error loading categories.json for sync: {e}")
+            logger.info(f"Error loading {settings.CATALOG_EXPORT_PATH} for sync: {e}")
             return
 
         async def sync_recursive(structure: dict, parent_id: int | None = None, path_stack: list[str] = []):
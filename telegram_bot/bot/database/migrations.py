@@ -0,0 +1,241 @@
+import logging
+from typing import Callable
+
+from sqlalchemy import Connection, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Ключ pg_advisory_xact_lock: реплики не применяют миграции одновременно
+MIGRATIONS_LOCK_ID = 7_140_215
+
+
+def _sql(*statements: str) -> Callable[[Connection], None]:
+    def migrate(conn: Connection):
+        for statement in statements:
+            conn.execute(text(statement))
+
+    return migrate
+
+
+# Миграции описаны явным SQL и не зависят от моделей: модели меняются, а
+# применённая миграция должна делать то же, что и при первом применении.
+_TIMESTAMPS = """
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL
+"""
+
+# Схема до появления миграций; у существующих баз таблицы уже есть
+_INITIAL_SCHEMA = _sql(
+    f"""
+    CREATE TABLE IF NOT EXISTS users (
+        id SERIAL PRIMARY KEY,
+        user_id BIGINT,
+        full_name VARCHAR NOT NULL,
+        username VARCHAR,
+        last_activity TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+        {_TIMESTAMPS}
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS categories (
+        id SERIAL PRIMARY KEY,
+        name VARCHAR NOT NULL,
+        prompt_text VARCHAR,
+        sort_order INTEGER NOT NULL,
+        parent_id INTEGER REFERENCES categories (id),
+        {_TIMESTAMPS}
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS items (
+        id SERIAL PRIMARY KEY,
+        name VARCHAR NOT NULL,
+        description VARCHAR,
+        content_type VARCHAR NOT NULL,
+        sort_order INTEGER NOT NULL,
+        file_id VARCHAR,
+        file_path VARCHAR,
+        category_id INTEGER NOT NULL REFERENCES categories (id),
+        {_TIMESTAMPS}
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS broadcast_jobs (
+        id SERIAL PRIMARY KEY,
+        status VARCHAR NOT NULL,
+        payload JSON NOT NULL,
+        admin_chat_id BIGINT NOT NULL,
+        progress_message_id INTEGER,
+        total INTEGER NOT NULL,
+        sent INTEGER NOT NULL,
+        failed INTEGER NOT NULL,
+        blocked INTEGER NOT NULL,
+        cursor BIGINT NOT NULL,
+        finished_at TIMESTAMP WITH TIME ZONE,
+        {_TIMESTAMPS}
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS broadcast_deliveries (
+        job_id INTEGER NOT NULL REFERENCES broadcast_jobs (id) ON DELETE CASCADE,
+        user_id BIGINT NOT NULL,
+        status VARCHAR NOT NULL,
+        {_TIMESTAMPS},
+        PRIMARY KEY (job_id, user_id)
+    )
+    """,
+)
+
+
+def _create_user_daily_stats(conn: Connection):
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS user_daily_stats (
+            day DATE PRIMARY KEY,
+            new_users INTEGER NOT NULL,
+            last_active_users INTEGER NOT NULL,
+            {_TIMESTAMPS}
+        )
+    """))
+    conn.execute(text("""
+        INSERT INTO user_daily_stats (day, new_users, last_active_users)
+        SELECT day, SUM(new_users), SUM(last_active_users)
+        FROM (
+            SELECT (created_at AT TIME ZONE 'UTC')::date AS day, 1 AS new_users, 0 AS last_active_users FROM users
+            UNION ALL
+            SELECT (last_activity AT TIME ZONE 'UTC')::date, 0, 1 FROM users
+        ) AS s
+        GROUP BY day
+        ON CONFLICT (day) DO NOTHING
+    """))
+
+
+def _create_retention_tables(conn: Connection):
+    conn.execute(text(
+        "ALTER TABLE user_daily_stats ADD COLUMN IF NOT EXISTS active_users INTEGER DEFAULT 0 NOT NULL"
+    ))
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS user_activity_days (
+            user_id BIGINT NOT NULL,
+            day DATE NOT NULL,
+            {_TIMESTAMPS},
+            PRIMARY KEY (user_id, day)
+        )
+    """))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_user_activity_days_day ON user_activity_days (day)"))
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS cohort_retention (
+            cohort_week DATE NOT NULL,
+            week_offset INTEGER NOT NULL,
+            users INTEGER NOT NULL,
+            {_TIMESTAMPS},
+            PRIMARY KEY (cohort_week, week_offset)
+        )
+    """))
+    # Истории активности до этой миграции нет — известен только последний день
+    conn.execute(text("""
+        INSERT INTO user_activity_days (user_id, day)
+        SELECT user_id, (last_activity AT TIME ZONE 'UTC')::date FROM users
+        ON CONFLICT DO NOTHING
+    """))
+    conn.execute(text("""
+        UPDATE user_daily_stats AS s SET active_users = a.n
+        FROM (SELECT day, COUNT(*) AS n FROM user_activity_days GROUP BY day) AS a
+        WHERE s.day = a.day
+    """))
+    conn.execute(text("""
+        INSERT INTO cohort_retention (cohort_week, week_offset, users)
+        SELECT date_trunc('week', u.created_at AT TIME ZONE 'UTC')::date AS cohort_week,
+               (date_trunc('week', d.day::timestamp)::date
+                - date_trunc('week', u.created_at AT TIME ZONE 'UTC')::date) / 7 AS week_offset,
+               COUNT(DISTINCT d.user_id)
+        FROM user_activity_days AS d
+        JOIN users AS u ON u.user_id = d.user_id
+        GROUP BY 1, 2
+        ON CONFLICT DO NOTHING
+    """))
+
+
+# (версия, описание, функция миграции) — строго по возрастанию версии.
+# Применённые миграции не меняются: изменения схемы добавляются новой версией.
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "initial schema", _INITIAL_SCHEMA),
+    (2, "categories.prompt_text and sort_order", _sql(
+        "ALTER TABLE categories ADD COLUMN IF NOT EXISTS prompt_text VARCHAR",
+        "ALTER TABLE categories ADD COLUMN IF NOT EXISTS sort_order INTEGER DEFAULT 0 NOT NULL",
+        "ALTER TABLE items ADD COLUMN IF NOT EXISTS sort_order INTEGER DEFAULT 0 NOT NULL",
+    )),
+    (3, "blocked users tracking", _sql(
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS is_blocked BOOLEAN DEFAULT false NOT NULL",
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS blocked_at TIMESTAMP WITH TIME ZONE",
+        "CREATE INDEX IF NOT EXISTS ix_users_is_blocked ON users (is_blocked)",
+    )),
+    (4, "unique users.user_id", _sql(
+        # Дубликаты от гонки select-then-insert: оставляем первую запись,
+        # перенося в неё самую позднюю активность
+        """
+        UPDATE users AS u SET last_activity = d.last_activity
+        FROM (SELECT user_id, MIN(id) AS id, MAX(last_activity) AS last_activity
+              FROM users GROUP BY user_id HAVING COUNT(*) > 1) AS d
+        WHERE u.id = d.id
+        """,
+        "DELETE FROM users AS u USING users AS d WHERE u.user_id = d.user_id AND u.id > d.id",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_user_id ON users (user_id)",
+    )),
+    (5, "catalog and users lookup indexes", _sql(
+        "CREATE INDEX IF NOT EXISTS ix_categories_parent_id ON categories (parent_id)",
+        "CREATE INDEX IF NOT EXISTS ix_items_category_id_sort_order ON items (category_id, sort_order)",
+        "CREATE INDEX IF NOT EXISTS ix_users_created_at ON users (created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_users_last_activity ON users (last_activity)",
+    )),
+    (6, "user_daily_stats rollups", _create_user_daily_stats),
+    (7, "activity days and cohort retention", _create_retention_tables),
+    (8, "drop timestamps from append-only tables", _sql(
+        "ALTER TABLE user_activity_days DROP COLUMN IF EXISTS created_at, DROP COLUMN IF EXISTS updated_at",
+        "ALTER TABLE broadcast_deliveries DROP COLUMN IF EXISTS created_at, DROP COLUMN IF EXISTS updated_at",
+    )),
+    (9, "broadcast job leases", _sql(
+        "ALTER TABLE broadcast_jobs ADD COLUMN IF NOT EXISTS owner VARCHAR",
+        "ALTER TABLE broadcast_jobs ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMP WITH TIME ZONE",
+    )),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+async def _current_version(conn) -> int:
+    exists = await conn.scalar(text("SELECT to_regclass('schema_version') IS NOT NULL"))
+    if not exists:
+        return 0
+    return await conn.scalar(text("SELECT COALESCE(MAX(version), 0) FROM schema_version"))
+
+
+async def run_migrations(engine: AsyncEngine):
+    """Применяет недостающие миграции; при актуальной схеме — один короткий запрос."""
+    async with engine.connect() as conn:
+        version = await _current_version(conn)
+    if version >= LATEST_VERSION:
+        logger.info(f"Database schema is up to date (version {version})")
+        return
+
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATIONS_LOCK_ID})
+        await conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description VARCHAR NOT NULL,
+                applied_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL
+            )
+        """))
+        # Перечитываем под блокировкой: миграции могла применить другая реплика
+        version = await _current_version(conn)
+        for number, description, migrate in MIGRATIONS:
+            if number <= version:
+                continue
+            logger.info(f"Applying migration {number}: {description}")
+            await conn.run_sync(migrate)
+            await conn.execute(
+                text("INSERT INTO schema_version (version, description) VALUES (:version, :description)"),
+                {"version": number, "description": description},
+            )
+    logger.info(f"Database schema migrated to version {LATEST_VERSION}")
@@ -1,13 +1,12 @@
 import logging
-from datetime import datetime
+from datetime import date, datetime
 
-from sqlalchemy import BigInteger, DateTime, func, ForeignKey, Integer
+from sqlalchemy import BigInteger, Boolean, Date, DateTime, func, ForeignKey, Index, Integer, JSON, false
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
-from sqlalchemy import text
-
 from bot.database.ensure_db_created import create_database
+from bot.database.migrations import run_migrations
 from bot.utils.config import settings
 
 engine = create_async_engine(settings.SQLALCHEMY_URL, echo=False,
@@ -17,7 +16,14 @@ async_session = async_sessionmaker(engine)
 logger = logging.getLogger(__name__)
 
 
-class Base(AsyncAttrs, DeclarativeBase):
+class ModelBase(AsyncAttrs, DeclarativeBase):
+    """Общие metadata всех таблиц; напрямую наследуют таблицы только на добавление,
+    которым не нужны created_at/updated_at."""
+
+
+class Base(ModelBase):
+    __abstract__ = True
+
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         server_default=func.now(),
@@ -32,16 +38,57 @@ class Base(AsyncAttrs, DeclarativeBase):
 
 class User(Base):
     __tablename__ = 'users'
+    __table_args__ = (Index("ix_users_created_at", "created_at"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    user_id = mapped_column(BigInteger)
+    user_id = mapped_column(BigInteger, unique=True, index=True)
     full_name: Mapped[str] = mapped_column()
     username: Mapped[str] = mapped_column(nullable=True)
     last_activity: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         server_default=func.now(),
         nullable=False,
+        index=True,
     )
+    # Пользователь заблокировал бота или удалил аккаунт
+    is_blocked: Mapped[bool] = mapped_column(Boolean, default=False, server_default=false(),
+                                             nullable=False, index=True)
+    blocked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class UserDailyStats(Base):
+    """Дневные агрегаты пользователей (дни по UTC).
+
+    new_users — зарегистрировались в этот день, last_active_users — у скольких
+    пользователей last_activity приходится на этот день. Сумма last_active_users
+    за N дней равна числу пользователей, активных за эти N дней.
+    """
+    __tablename__ = 'user_daily_stats'
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    new_users: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_active_users: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # Уникальных пользователей, активных в этот день (DAU)
+    active_users: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+
+
+class UserActivityDay(ModelBase):
+    """Дни активности пользователей (по UTC), только добавление."""
+    __tablename__ = 'user_activity_days'
+    __table_args__ = (Index("ix_user_activity_days_day", "day"),)
+
+    user_id = mapped_column(BigInteger, primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+
+
+class CohortRetention(Base):
+    """Сколько пользователей недельной когорты регистрации были активны
+    через `week_offset` недель после неё."""
+    __tablename__ = 'cohort_retention'
+
+    cohort_week: Mapped[date] = mapped_column(Date, primary_key=True)
+    week_offset: Mapped[int] = mapped_column(Integer, primary_key=True)
+    users: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
 
 
 class Category(Base):
@@ -52,7 +99,7 @@ class Category(Base):
     prompt_text: Mapped[str | None] = mapped_column(nullable=True)
     sort_order: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
 
-    parent_id: Mapped[int | None] = mapped_column(ForeignKey('categories.id'), nullable=True)
+    parent_id: Mapped[int | None] = mapped_column(ForeignKey('categories.id'), nullable=True, index=True)
 
     children: Mapped[list["Category"]] = relationship("Category", back_populates="parent", cascade="all, delete-orphan")
     parent: Mapped["Category | None"] = relationship("Category", back_populates="children", remote_side=[id])
@@ -64,6 +111,7 @@ class Category(Base):
 
 class Item(Base):
     __tablename__ = 'items'
+    __table_args__ = (Index("ix_items_category_id_sort_order", "category_id", "sort_order"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(nullable=False)
@@ -80,44 +128,46 @@ class Item(Base):
     category: Mapped["Category"] = relationship("Category", back_populates="items")
 
 
+class BroadcastJob(Base):
+    __tablename__ = 'broadcast_jobs'
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    status: Mapped[str] = mapped_column(nullable=False, default="running")
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+
+    admin_chat_id = mapped_column(BigInteger, nullable=False)
+    progress_message_id: Mapped[int | None] = mapped_column(nullable=True)
+
+    total: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    sent: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    failed: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    blocked: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    # users.id последнего полностью обработанного пакета получателей
+    cursor = mapped_column(BigInteger, default=0, nullable=False)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    # Аренда задачи: реплика-исполнитель и время последнего продления
+    owner: Mapped[str | None] = mapped_column(nullable=True)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class BroadcastDelivery(ModelBase):
+    """Доставка рассылки получателю, только добавление и смена статуса."""
+    __tablename__ = 'broadcast_deliveries'
+
+    job_id: Mapped[int] = mapped_column(ForeignKey('broadcast_jobs.id', ondelete="CASCADE"), primary_key=True)
+    user_id = mapped_column(BigInteger, primary_key=True)
+    # sending / sent / failed / blocked
+    status: Mapped[str] = mapped_column(nullable=False, default="sending")
+
+
 async def on_startup_database():
     logger.info(f"Connecting to DB: {settings.SQLALCHEMY_DB_NAME} at {settings.SQLALCHEMY_IP}")
     create_database(settings.SQLALCHEMY_DB_NAME, settings.SQLALCHEMY_USER, settings.SQLALCHEMY_PASSWORD,
                     settings.SQLALCHEMY_IP, settings.SQLALCHEMY_PORT)
 
-    logger.info(f"Registered tables: {Base.metadata.tables.keys()}")
-
-    async with engine.begin() as conn:
-        logger.info("Creating tables...")
-        await conn.run_sync(Base.metadata.create_all)
-        logger.info("Tables created (if not existed).")
-
-        # Migration for prompt_text
-        try:
-            logger.info("Running migration for prompt_text...")
-            async with conn.begin_nested():
-                await conn.execute(text("ALTER TABLE categories ADD COLUMN prompt_text VARCHAR"))
-            logger.info("Added prompt_text column to categories")
-        except Exception as e:
-            logger.info(f"Migration skipped (likely column exists): {e}")
-
-        # Migration for sort_order in categories
-        try:
-            logger.info("Running migration for sort_order in categories...")
-            async with conn.begin_nested():
-                await conn.execute(text("ALTER TABLE categories ADD COLUMN sort_order INTEGER DEFAULT 0 NOT NULL"))
-            logger.info("Added sort_order column to categories")
-        except Exception as e:
-            logger.info(f"Migration skipped (likely column exists): {e}")
-
-        # Migration for sort_order in items
-        try:
-            logger.info("Running migration for sort_order in items...")
-            async with conn.begin_nested():
-                await conn.execute(text("ALTER TABLE items ADD COLUMN sort_order INTEGER DEFAULT 0 NOT NULL"))
-            logger.info("Added sort_order column to items")
-        except Exception as e:
-            logger.info(f"Migration skipped (likely column exists): {e}")
+    await run_migrations(engine)
 
     logger.info("Initializing categories...")
     from bot.database.initialization import create_initial_categories, sync_init_files
@@ -0,0 +1,203 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update, delete, func, or_
+from sqlalchemy.dialects.postgresql import insert
+
+from bot.database.models import async_session, BroadcastJob, BroadcastDelivery
+
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+BLOCKED = "blocked"
+
+
+class BroadcastLeaseLost(Exception):
+    """Аренду задачи рассылки забрала другая реплика."""
+
+
+async def create_broadcast_job(payload: dict, admin_chat_id: int, total: int, owner: str) -> BroadcastJob:
+    async with async_session() as session:
+        job = BroadcastJob(payload=payload, admin_chat_id=admin_chat_id, total=total,
+                           owner=owner, heartbeat_at=datetime.now(timezone.utc))
+        session.add(job)
+        await session.commit()
+        await session.refresh(job)
+        return job
+
+
+async def set_broadcast_progress_message(job_id: int, message_id: int):
+    async with async_session() as session:
+        await session.execute(
+            update(BroadcastJob).where(BroadcastJob.id == job_id).values(progress_message_id=message_id)
+        )
+        await session.commit()
+
+
+async def get_unfinished_broadcast_jobs() -> list[BroadcastJob]:
+    async with async_session() as session:
+        result = await session.scalars(
+            select(BroadcastJob).where(BroadcastJob.status == "running").order_by(BroadcastJob.id)
+        )
+        return result.all()
+
+
+async def get_recent_broadcast_jobs(limit: int = 10) -> list[BroadcastJob]:
+    async with async_session() as session:
+        result = await session.scalars(select(BroadcastJob).order_by(BroadcastJob.id.desc()).limit(limit))
+        return result.all()
+
+
+async def acquire_broadcast_job(job_id: int, owner: str, lease_timeout: float) -> BroadcastJob | None:
+    """Берёт незавершённую задачу в аренду, если её никто не выполняет: аренда
+    свободна или не продлевалась дольше `lease_timeout` секунд. Иначе None."""
+    async with async_session(expire_on_commit=False) as session:
+        job = await session.scalar(
+            update(BroadcastJob)
+            .where(
+                BroadcastJob.id == job_id,
+                BroadcastJob.status == "running",
+                or_(BroadcastJob.owner.is_(None),
+                    BroadcastJob.heartbeat_at < func.now() - timedelta(seconds=lease_timeout)),
+            )
+            .values(owner=owner, heartbeat_at=func.now())
+            .returning(BroadcastJob),
+            execution_options={"populate_existing": True},
+        )
+        await session.commit()
+        return job
+
+
+async def renew_broadcast_lease(job_id: int, owner: str) -> bool:
+    """Продлевает аренду; False, если задача уже принадлежит другой реплике."""
+    async with async_session() as session:
+        renewed = await session.scalar(
+            update(BroadcastJob)
+            .where(BroadcastJob.id == job_id, BroadcastJob.owner == owner)
+            .values(heartbeat_at=func.now())
+            .returning(BroadcastJob.id)
+        )
+        await session.commit()
+        return renewed is not None
+
+
+async def release_broadcast_job(job_id: int, owner: str):
+    """Освобождает аренду, чтобы задачу сразу могла продолжить любая реплика."""
+    async with async_session() as session:
+        await session.execute(
+            update(BroadcastJob).where(BroadcastJob.id == job_id, BroadcastJob.owner == owner).values(owner=None)
+        )
+        await session.commit()
+
+
+async def claim_deliveries(job_id: int, user_ids: list[int]) -> list[int]:
+    """Резервирует доставку получателям, которым эта рассылка ещё не отправлялась.
+
+    Возвращает только впервые зарезервированных пользователей — повторной
+    отправки после перезапуска не будет.
+    """
+    if not user_ids:
+        return []
+    async with async_session() as session:
+        result = await session.scalars(
+            insert(BroadcastDelivery)
+            .values([{"job_id": job_id, "user_id": user_id, "status": SENDING} for user_id in user_ids])
+            .on_conflict_do_nothing()
+            .returning(BroadcastDelivery.user_id)
+        )
+        claimed = result.all()
+        await session.commit()
+        return claimed
+
+
+async def record_delivery_results(job_id: int, owner: str, results: dict[int, str], cursor: int | None = None):
+    """Сохраняет статусы доставки, увеличивает счётчики задачи и сдвигает контрольную точку.
+
+    Выполняется, только пока `owner` держит аренду задачи, иначе BroadcastLeaseLost
+    и ничего не сохраняется.
+    """
+    by_status: dict[str, list[int]] = {}
+    for user_id, status in results.items():
+        by_status.setdefault(status, []).append(user_id)
+
+    async with async_session() as session:
+        for status, user_ids in by_status.items():
+            await session.execute(
+                update(BroadcastDelivery)
+                .where(BroadcastDelivery.job_id == job_id, BroadcastDelivery.user_id.in_(user_ids))
+                .values(status=status)
+            )
+        values = {
+            "sent": BroadcastJob.sent + len(by_status.get(SENT, [])),
+            "failed": BroadcastJob.failed + len(by_status.get(FAILED, [])),
+            "blocked": BroadcastJob.blocked + len(by_status.get(BLOCKED, [])),
+        }
+        if cursor is not None:
+            values["cursor"] = cursor
+        updated = await session.scalar(
+            update(BroadcastJob).where(BroadcastJob.id == job_id, BroadcastJob.owner == owner)
+            .values(**values).returning(BroadcastJob.id)
+        )
+        if updated is None:
+            raise BroadcastLeaseLost(f"Broadcast job {job_id} is no longer owned by {owner}")
+        await session.commit()
+
+
+async def release_deliveries(job_id: int, user_ids: list[int]):
+    """Снимает резерв с получателей, которым отправка так и не началась."""
+    if not user_ids:
+        return
+    async with async_session() as session:
+        await session.execute(
+            delete(BroadcastDelivery)
+            .where(BroadcastDelivery.job_id == job_id, BroadcastDelivery.user_id.in_(user_ids))
+        )
+        await session.commit()
+
+
+async def fail_interrupted_deliveries(job_id: int) -> int:
+    """Доставки, прерванные падением процесса, помечаются как неудачные.
+
+    Дошло ли сообщение, неизвестно, поэтому повторно они не отправляются.
+    Вызывается только репликой, взявшей задачу в аренду: другой исполнитель
+    в это время не отправляет.
+    """
+    async with async_session() as session:
+        result = await session.scalars(
+            update(BroadcastDelivery)
+            .where(BroadcastDelivery.job_id == job_id, BroadcastDelivery.status == SENDING)
+            .values(status=FAILED)
+            .returning(BroadcastDelivery.user_id)
+        )
+        count = len(result.all())
+        if count:
+            await session.execute(
+                update(BroadcastJob).where(BroadcastJob.id == job_id)
+                .values(failed=BroadcastJob.failed + count)
+            )
+        await session.commit()
+        return count
+
+
+async def finish_broadcast_job(job_id: int, status: str = "finished") -> BroadcastJob:
+    async with async_session() as session:
+        await session.execute(
+            update(BroadcastJob).where(BroadcastJob.id == job_id)
+            .values(status=status, finished_at=datetime.now(timezone.utc), owner=None)
+        )
+        await session.commit()
+        return await session.get(BroadcastJob, job_id)
+
+
+async def prune_broadcast_deliveries(older_than: timedelta) -> int:
+    """Удаляет статусы доставки рассылок, завершённых раньше `older_than` назад.
+
+    Счётчики задачи остаются, пропадает только разбивка по получателям.
+    """
+    async with async_session() as session:
+        finished = select(BroadcastJob.id).where(
+            BroadcastJob.status != "running",
+            BroadcastJob.finished_at < datetime.now(timezone.utc) - older_than,
+        )
+        result = await session.execute(delete(BroadcastDelivery).where(BroadcastDelivery.job_id.in_(finished)))
+        await session.commit()
+        return result.rowcount
@@ -1,81 +1,27 @@
-import json
 import logging
+from dataclasses import dataclass, field
 
-from sqlalchemy import select, update, func
+from sqlalchemy import select, update, func, literal_column, and_, or_
+from sqlalchemy.orm import aliased
 
+from bot.database.catalog import catalog
+from bot.database.catalog_export import catalog_exporter
 from bot.database.models import async_session, Category, Item
 
 logger = logging.getLogger(__name__)
 
 
-async def export_categories_to_json(file_path: str = "categories.json"):
-    async with async_session() as session:
-        categories = await session.scalars(select(Category))
-        all_categories = categories.all()
-        items_result = await session.scalars(select(Item))
-        all_items = items_result.all()
-
-        items_map = {}
-        for item in all_items:
-            if item.category_id not in items_map:
-                items_map[item.category_id] = []
-            items_map[item.category_id].append(item)
-
-        cat_map = {cat.id: cat for cat in all_categories}
-        children_map = {}
-        roots = []
-
-        for cat in all_categories:
-            if cat.parent_id is None:
-                roots.append(cat)
-            else:
-                if cat.parent_id not in children_map:
-                    children_map[cat.parent_id] = []
-                children_map[cat.parent_id].append(cat)
-
-        def build_tree(category_id):
-            tree = {}
-            children = children_map.get(category_id, [])
-            children.sort(key=lambda x: x.sort_order)
-            for child in children:
-                cat_items = items_map.get(child.id, [])
-                cat_items.sort(key=lambda x: x.sort_order)
-                items_data = []
-                for item in cat_items:
-                    items_data.append({
-                        "name": item.name, "description": item.description,
-                        "content_type": item.content_type, "file_id": item.file_id,
-                        "file_path": item.file_path, "sort_order": item.sort_order
-                    })
-                child_data = {
-                    "prompt_text": child.prompt_text, "sort_order": child.sort_order,
-                    "items": items_data, "subcategories": build_tree(child.id)
-                }
-                tree[child.name] = child_data
-            return tree
-
-        final_structure = {}
-        roots.sort(key=lambda x: x.sort_order)
-        for root in roots:
-            cat_items = items_map.get(root.id, [])
-            cat_items.sort(key=lambda x: x.sort_order)
-            items_data = []
-            for item in cat_items:
-                items_data.append({
-                    "name": item.name, "description": item.description,
-                    "content_type": item.content_type, "file_id": item.file_id,
-                    "file_path": item.file_path, "sort_order": item.sort_order
-                })
-            final_structure[root.name] = {
-                "prompt_text": root.prompt_text, "sort_order": root.sort_order,
-                "items": items_data, "subcategories": build_tree(root.id)
-            }
-
-    try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(final_structure, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        logger.error(f"Error exporting categories to JSON: {e}")
+@dataclass
+class CategoryView:
+    """Данные для экрана категории: сама категория, её родитель, подкатегории и предметы."""
+    category: Category | None
+    parent: Category | None = None
+    children: list[Category] = field(default_factory=list)
+    items: list[Item] = field(default_factory=list)
+
+    @property
+    def parent_id(self) -> int | None:
+        return self.category.parent_id if self.category else None
 
 
 async def get_root_categories():
@@ -96,6 +42,44 @@ async def get_subcategories(category_id: int):
         return result.all()
 
 
+async def get_category_view(category_id: int | None) -> CategoryView:
+    """Загружает категорию, её родителя, подкатегории и предметы за один запрос.
+
+    Строки категорий (сама категория, родитель и дети) объединены с предметами
+    через LEFT JOIN, который срабатывает только для запрошенной категории.
+    """
+    async with async_session() as session:
+        if category_id is None:
+            result = await session.scalars(
+                select(Category).where(Category.parent_id.is_(None))
+                .order_by(Category.sort_order, Category.id)
+            )
+            return CategoryView(category=None, children=list(result.all()))
+
+        lookup = aliased(Category)
+        parent_id = select(lookup.parent_id).where(lookup.id == category_id).scalar_subquery()
+        result = await session.execute(
+            select(Category, Item)
+            .outerjoin(Item, and_(Item.category_id == Category.id, Category.id == category_id))
+            .where(or_(Category.id == category_id, Category.parent_id == category_id, Category.id == parent_id))
+            .order_by(Category.sort_order, Category.id, Item.sort_order, Item.id)
+        )
+        view = CategoryView(category=None)
+        others = []
+        for category, item in result.all():
+            if category.id == category_id:
+                view.category = category
+                if item is not None:
+                    view.items.append(item)
+            elif category.parent_id == category_id:
+                view.children.append(category)
+            else:
+                others.append(category)
+        if view.category is not None and view.category.parent_id is not None:
+            view.parent = next((c for c in others if c.id == view.category.parent_id), None)
+        return view
+
+
 async def get_category_by_id(category_id: int):
     async with async_session() as session:
         return await session.get(Category, category_id)
@@ -117,7 +101,8 @@ async def add_category(name: str, parent_id: int | None = None, prompt_text: str
         session.add(category)
         await session.commit()
         await session.refresh(category)
-    await export_categories_to_json()
+    catalog.put_category(category)
+    catalog_exporter.schedule()
     return category
 
 
@@ -126,7 +111,8 @@ async def update_category(category_id: int, **kwargs):
         stmt = update(Category).where(Category.id == category_id).values(**kwargs)
         await session.execute(stmt)
         await session.commit()
-    await export_categories_to_json()
+    catalog.patch_category(category_id, **kwargs)
+    catalog_exporter.schedule()
 
 
 async def delete_category(category_id: int):
@@ -135,7 +121,8 @@ async def delete_category(category_id: int):
         if category:
             await session.delete(category)
             await session.commit()
-    await export_categories_to_json()
+    catalog.remove_category(category_id)
+    catalog_exporter.schedule()
 
 
 async def move_category(category_id: int, direction: str) -> bool:
@@ -170,10 +157,13 @@ async def move_category(category_id: int, direction: str) -> bool:
             cat2.sort_order = swap_idx
             if direction == "up":
                 cat1.sort_order, cat2.sort_order = cat2.sort_order, cat1.sort_order
+        new_orders = {cat1.id: cat1.sort_order, cat2.id: cat2.sort_order}
         session.add(cat1)
         session.add(cat2)
         await session.commit()
-    await export_categories_to_json()
+    for cat_id, sort_order in new_orders.items():
+        catalog.patch_category(cat_id, sort_order=sort_order)
+    catalog_exporter.schedule()
     return True
 
 
@@ -188,25 +178,64 @@ async def swap_elements(id_a: int, id_b: int, is_category: bool) -> bool:
         a.sort_order, b.sort_order = b.sort_order, a.sort_order
         if a.sort_order == b.sort_order:
             a.sort_order, b.sort_order = 0, 1
+        new_orders = {a.id: a.sort_order, b.id: b.sort_order}
         session.add(a)
         session.add(b)
         await session.commit()
+    patch = catalog.patch_category if is_category else catalog.patch_item
+    for element_id, sort_order in new_orders.items():
+        patch(element_id, sort_order=sort_order)
     if is_category:
-        await export_categories_to_json()
+        catalog_exporter.schedule()
     return True
 
 
-async def get_category_full_path(category_id: int) -> list[str]:
+async def get_category_ancestors(category_id: int, include_self: bool = True) -> list[Category]:
+    """Цепочка категорий от корня до `category_id` одним рекурсивным запросом."""
+    tree = (
+        select(Category.id, Category.parent_id, literal_column("0").label("depth"))
+        .where(Category.id == category_id)
+        .cte("ancestors", recursive=True)
+    )
+    parent = aliased(Category)
+    tree = tree.union_all(
+        select(parent.id, parent.parent_id, tree.c.depth + 1)
+        .where(parent.id == tree.c.parent_id)
+    )
+    stmt = select(Category).join(tree, Category.id == tree.c.id).order_by(tree.c.depth.desc())
+    if not include_self:
+        stmt = stmt.where(tree.c.depth > 0)
+    async with async_session() as session:
+        result = await session.scalars(stmt)
+        return result.all()
+
+
+async def get_category_descendants(category_id: int | None) -> list[Category]:
+    """Все потомки категории (без неё самой) одним рекурсивным запросом,
+    упорядоченные по глубине, затем по sort_order."""
+    start = Category.parent_id.is_(None) if category_id is None else Category.parent_id == category_id
+    tree = (
+        select(Category.id, literal_column("1").label("depth"))
+        .where(start)
+        .cte("descendants", recursive=True)
+    )
+    child = aliased(Category)
+    tree = tree.union_all(
+        select(child.id, tree.c.depth + 1)
+        .where(child.parent_id == tree.c.id)
+    )
     async with async_session() as session:
-        path = []
-        current_id = category_id
-        while current_id:
-            category = await session.get(Category, current_id)
-            if not category:
-                break
-            path.insert(0, category.name)
-            current_id = category.parent_id
-        return path
+        result = await session.scalars(
+            select(Category).join(tree, Category.id == tree.c.id)
+            .order_by(tree.c.depth, Category.sort_order, Category.id)
+        )
+        return result.all()
+
+
+async def get_category_full_path(category_id: int) -> list[str]:
+    if not category_id:
+        return []
+    return [category.name for category in await get_category_ancestors(category_id)]
 
 
 async def get_items_by_category(category_id: int):
@@ -244,7 +273,8 @@ async def add_item(name: str, category_id: int, content_type: str, description:
         session.add(item)
         await session.commit()
         await session.refresh(item)
-        return item
+    catalog.put_item(item)
+    return item
 
 
 async def update_item(item_id: int, **kwargs):
@@ -252,6 +282,7 @@ async def update_item(item_id: int, **kwargs):
         stmt = update(Item).where(Item.id == item_id).values(**kwargs)
         await session.execute(stmt)
         await session.commit()
+    catalog.patch_item(item_id, **kwargs)
 
 
 async def delete_item(item_id: int):
@@ -260,6 +291,7 @@ async def delete_item(item_id: int):
         if item:
             await session.delete(item)
             await session.commit()
+    catalog.remove_item(item_id)
 
 
 async def move_item(item_id: int, direction: str) -> bool:
@@ -288,7 +320,10 @@ async def move_item(item_id: int, direction: str) -> bool:
             item2.sort_order = swap_idx
             if direction == "up":
                 item1.sort_order, item2.sort_order = item2.sort_order, item1.sort_order
+        new_orders = {item1.id: item1.sort_order, item2.id: item2.sort_order}
         session.add(item1)
         session.add(item2)
         await session.commit()
+    for element_id, sort_order in new_orders.items():
+        catalog.patch_item(element_id, sort_order=sort_order)
     return True
\ No newline at end of file
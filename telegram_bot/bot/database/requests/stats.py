@@ -0,0 +1,102 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select, func, text, bindparam, Date, DateTime
+
+from bot.database.models import async_session, User, UserDailyStats, CohortRetention
+
+_RECONCILE_DAILY_STATS = text("""
+    WITH days AS (
+        SELECT generate_series(:since, :today, interval '1 day')::date AS day
+    ),
+    new AS (
+        SELECT (created_at AT TIME ZONE 'UTC')::date AS day, COUNT(*) AS n
+        FROM users WHERE created_at >= :since_ts GROUP BY 1
+    ),
+    last_active AS (
+        SELECT (last_activity AT TIME ZONE 'UTC')::date AS day, COUNT(*) AS n
+        FROM users WHERE last_activity >= :since_ts GROUP BY 1
+    ),
+    active AS (
+        SELECT day, COUNT(*) AS n FROM user_activity_days WHERE day >= :since GROUP BY 1
+    )
+    INSERT INTO user_daily_stats (day, new_users, last_active_users, active_users)
+    SELECT days.day, COALESCE(new.n, 0), COALESCE(last_active.n, 0), COALESCE(active.n, 0)
+    FROM days
+    LEFT JOIN new ON new.day = days.day
+    LEFT JOIN last_active ON last_active.day = days.day
+    LEFT JOIN active ON active.day = days.day
+    ON CONFLICT (day) DO UPDATE
+    SET new_users = excluded.new_users, last_active_users = excluded.last_active_users,
+        active_users = excluded.active_users, updated_at = now()
+""").bindparams(
+    bindparam("since", type_=Date),
+    bindparam("today", type_=Date),
+    bindparam("since_ts", type_=DateTime(timezone=True)),
+)
+
+
+async def reconcile_daily_stats(since: date, today: date, since_ts: datetime):
+    """Пересчитывает строки user_daily_stats за дни [since, today] по таблице users.
+
+    `since_ts` — начало дня `since` по UTC; выборка идёт по индексам
+    created_at и last_activity и затрагивает только пользователей этих дней.
+    """
+    async with async_session() as session:
+        await session.execute(_RECONCILE_DAILY_STATS, {"since": since, "today": today, "since_ts": since_ts})
+        await session.commit()
+
+
+async def get_daily_stats(since: date, until: date) -> list[UserDailyStats]:
+    """Дневные агрегаты за дни [since, until)."""
+    async with async_session() as session:
+        result = await session.scalars(
+            select(UserDailyStats)
+            .where(UserDailyStats.day >= since, UserDailyStats.day < until)
+            .order_by(UserDailyStats.day)
+        )
+        return result.all()
+
+
+async def get_new_users_total(until: date) -> int:
+    """Число пользователей, зарегистрированных до дня `until`."""
+    async with async_session() as session:
+        total = await session.scalar(
+            select(func.coalesce(func.sum(UserDailyStats.new_users), 0)).where(UserDailyStats.day < until)
+        )
+        return int(total)
+
+
+async def get_current_day_stats(day_start: datetime) -> dict:
+    """Новые и активные с `day_start`, а также заблокировавшие бота — по индексам users."""
+    async with async_session() as session:
+        new_users = await session.scalar(select(func.count(User.id)).where(User.created_at >= day_start))
+        active_users = await session.scalar(select(func.count(User.id)).where(User.last_activity >= day_start))
+        blocked_users = await session.scalar(select(func.count(User.id)).where(User.is_blocked.is_(True)))
+        return {
+            "new_users": new_users,
+            "active_users": active_users,
+            "blocked_users": blocked_users,
+        }
+
+
+async def get_cohort_sizes(since: date) -> dict[date, int]:
+    """Размер недельных когорт регистрации (неделя с понедельника), начиная с недели `since`."""
+    async with async_session() as session:
+        result = await session.execute(
+            select(UserDailyStats.day, UserDailyStats.new_users).where(UserDailyStats.day >= since)
+        )
+        sizes: dict[date, int] = {}
+        for day, new_users in result.all():
+            week = day - timedelta(days=day.weekday())
+            sizes[week] = sizes.get(week, 0) + new_users
+        return sizes
+
+
+async def get_cohort_retention(since: date) -> list[CohortRetention]:
+    async with async_session() as session:
+        result = await session.scalars(
+            select(CohortRetention)
+            .where(CohortRetention.cohort_week >= since)
+            .order_by(CohortRetention.cohort_week, CohortRetention.week_offset)
+        )
+        return result.all()
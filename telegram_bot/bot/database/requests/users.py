@@ -1,34 +1,76 @@
-from datetime import datetime, timedelta, timezone
+from datetime import datetime
+from typing import AsyncIterator
 
-from sqlalchemy import select, update, delete, func, case
+from sqlalchemy import select, update, delete, func, text, bindparam, BigInteger, DateTime
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 from sqlalchemy.exc import SQLAlchemyError
 
 from bot.database.models import async_session, User
+from bot.utils.config import settings
 
 
-async def get_users():
+async def iter_user_batches(batch_size: int = settings.USERS_BATCH_SIZE, after_id: int = 0,
+                            include_blocked: bool = False) -> AsyncIterator[list]:
+    """Пакеты строк (users.id, users.user_id) по возрастанию users.id.
+
+    Keyset-пагинация: каждый пакет — отдельный короткий запрос, поэтому память
+    и соединения не зависят от размера таблицы, а `after_id` позволяет
+    продолжить обход с контрольной точки. Заблокировавшие бота пропускаются,
+    если не указано `include_blocked`.
+    """
+    while True:
+        stmt = select(User.id, User.user_id).where(User.id > after_id)
+        if not include_blocked:
+            stmt = stmt.where(User.is_blocked.is_(False))
+        async with async_session() as session:
+            result = await session.execute(stmt.order_by(User.id).limit(batch_size))
+            rows = result.all()
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1].id
+
+
+async def get_users_count(include_blocked: bool = False) -> int:
+    stmt = select(func.count(User.id))
+    if not include_blocked:
+        stmt = stmt.where(User.is_blocked.is_(False))
     async with async_session() as session:
-        result = await session.scalars(select(User))
-        return [r for r in result]
+        return await session.scalar(stmt)
 
 
-async def get_user_ids():
+async def mark_user_blocked(user_id: int):
     async with async_session() as session:
-        result = await session.scalars(select(User.user_id))
-        return result.all()
+        await session.execute(
+            update(User).where(User.user_id == user_id, User.is_blocked.is_(False))
+            .values(is_blocked=True, blocked_at=func.now())
+        )
+        await session.commit()
 
 
 async def add_user(user_id: int, **kwargs) -> User:
-    async with async_session() as session:
-        try:
-            user = await session.scalar(select(User).where(User.user_id == user_id))
-
-            if not user:
-                user = User(user_id=user_id, **kwargs)
-                session.add(user)
-                await session.commit()
-                await session.refresh(user)
+    """Создаёт пользователя или обновляет его профиль одним запросом.
 
+    INSERT ... ON CONFLICT по уникальному users.user_id не даёт гонке двух
+    апдейтов нового пользователя создать дубликат. Написавший боту
+    пользователь перестаёт считаться заблокировавшим его.
+    """
+    stmt = insert(User).values(user_id=user_id, **kwargs)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[User.user_id],
+        set_={
+            **{key: stmt.excluded[key] for key in kwargs},
+            "is_blocked": False,
+            "blocked_at": None,
+        },
+    ).returning(User)
+
+    # Без expire_on_commit возвращённый объект остаётся загруженным после
+    # закрытия сессии — кэш пользователей читает его атрибуты
+    async with async_session(expire_on_commit=False) as session:
+        try:
+            user = await session.scalar(stmt, execution_options={"populate_existing": True})
+            await session.commit()
             return user
 
         except SQLAlchemyError:
@@ -48,73 +90,93 @@ async def update_user(user_id: int, **kwargs):
         await session.commit()
 
 
-async def delete_user(user_id: int):
+async def update_users(rows: list[dict]):
+    """Пакетное обновление по первичному ключу: каждая строка — {"id": users.id, поле: значение, ...}."""
+    if not rows:
+        return
     async with async_session() as session:
-        await session.execute(delete(User).where(User.user_id == user_id))
+        await session.execute(update(User), rows)
         await session.commit()
 
 
-async def get_user_stats() -> dict:
-    """
-    Возвращает агрегированную статистику пользователей.
-
-    Ключи в словаре:
-        - total_users
-        - new_users_24h, new_users_3d, new_users_7d, new_users_30d
-        - active_users_24h, active_users_3d, active_users_7d, active_users_30d
+_UPDATE_LAST_ACTIVITY = text("""
+    WITH moved AS (
+        UPDATE users AS u
+        SET last_activity = v.seen_at
+        FROM unnest(:user_ids, :seen_at) AS v(user_id, seen_at), users AS old
+        WHERE u.user_id = v.user_id AND old.id = u.id AND u.last_activity < v.seen_at
+        RETURNING (old.last_activity AT TIME ZONE 'UTC')::date AS old_day,
+                  (v.seen_at AT TIME ZONE 'UTC')::date AS new_day
+    ),
+    deltas AS (
+        SELECT old_day AS day, -1 AS delta FROM moved WHERE old_day <> new_day
+        UNION ALL
+        SELECT new_day, 1 FROM moved WHERE old_day <> new_day
+    )
+    INSERT INTO user_daily_stats (day, new_users, last_active_users)
+    SELECT day, 0, SUM(delta) FROM deltas GROUP BY day
+    ON CONFLICT (day) DO UPDATE
+    SET last_active_users = user_daily_stats.last_active_users + excluded.last_active_users
+""").bindparams(
+    bindparam("user_ids", type_=ARRAY(BigInteger)),
+    bindparam("seen_at", type_=ARRAY(DateTime(timezone=True))),
+)
+
+
+# Новые дни активности дополняют DAU и недельные когорты: пользователь
+# учитывается в когорте один раз за неделю — в первый активный день недели
+_RECORD_ACTIVITY_DAYS = text("""
+    WITH new AS (
+        INSERT INTO user_activity_days (user_id, day)
+        SELECT user_id, (seen_at AT TIME ZONE 'UTC')::date
+        FROM unnest(:user_ids, :seen_at) AS v(user_id, seen_at)
+        ON CONFLICT DO NOTHING
+        RETURNING user_id, day
+    ),
+    daily AS (
+        INSERT INTO user_daily_stats (day, new_users, last_active_users, active_users)
+        SELECT day, 0, 0, COUNT(*) FROM new GROUP BY day
+        ON CONFLICT (day) DO UPDATE
+        SET active_users = user_daily_stats.active_users + excluded.active_users
+    )
+    INSERT INTO cohort_retention (cohort_week, week_offset, users)
+    SELECT date_trunc('week', u.created_at AT TIME ZONE 'UTC')::date,
+           (date_trunc('week', new.day::timestamp)::date
+            - date_trunc('week', u.created_at AT TIME ZONE 'UTC')::date) / 7,
+           COUNT(*)
+    FROM new
+    JOIN users AS u ON u.user_id = new.user_id
+    WHERE NOT EXISTS (
+        SELECT 1 FROM user_activity_days AS d
+        WHERE d.user_id = new.user_id
+          AND d.day >= date_trunc('week', new.day::timestamp)::date AND d.day < new.day
+    )
+    GROUP BY 1, 2
+    ON CONFLICT (cohort_week, week_offset) DO UPDATE
+    SET users = cohort_retention.users + excluded.users
+""").bindparams(
+    bindparam("user_ids", type_=ARRAY(BigInteger)),
+    bindparam("seen_at", type_=ARRAY(DateTime(timezone=True))),
+)
+
+
+async def update_last_activity(activity: dict[int, datetime]):
+    """Одним запросом обновляет last_activity пользователям {user_id: время активности}.
+
+    Пользователи, чья последняя активность перешла на другой день, переносятся
+    между строками user_daily_stats; новые дни активности записываются в
+    user_activity_days и агрегаты удержания.
     """
-    now = datetime.now(timezone.utc)
+    if not activity:
+        return
+    params = {"user_ids": list(activity.keys()), "seen_at": list(activity.values())}
+    async with async_session() as session:
+        await session.execute(_UPDATE_LAST_ACTIVITY, params)
+        await session.execute(_RECORD_ACTIVITY_DAYS, params)
+        await session.commit()
 
-    thresholds = {
-        "24h": now - timedelta(hours=24),
-        "3d": now - timedelta(days=3),
-        "7d": now - timedelta(days=7),
-        "30d": now - timedelta(days=30),
-    }
 
+async def delete_user(user_id: int):
     async with async_session() as session:
-        result = await session.execute(
-            select(
-                func.count(User.id).label("total_users"),
-
-                func.count(
-                    case((User.created_at >= thresholds["24h"], 1))
-                ).label("new_users_24h"),
-                func.count(
-                    case((User.created_at >= thresholds["3d"], 1))
-                ).label("new_users_3d"),
-                func.count(
-                    case((User.created_at >= thresholds["7d"], 1))
-                ).label("new_users_7d"),
-                func.count(
-                    case((User.created_at >= thresholds["30d"], 1))
-                ).label("new_users_30d"),
-
-                func.count(
-                    case((User.last_activity >= thresholds["24h"], 1))
-                ).label("active_users_24h"),
-                func.count(
-                    case((User.last_activity >= thresholds["3d"], 1))
-                ).label("active_users_3d"),
-                func.count(
-                    case((User.last_activity >= thresholds["7d"], 1))
-                ).label("active_users_7d"),
-                func.count(
-                    case((User.last_activity >= thresholds["30d"], 1))
-                ).label("active_users_30d"),
-            )
-        )
-
-        row = result.one()
-
-        return {
-            "total_users": row.total_users,
-            "new_users_24h": row.new_users_24h,
-            "new_users_3d": row.new_users_3d,
-            "new_users_7d": row.new_users_7d,
-            "new_users_30d": row.new_users_30d,
-            "active_users_24h": row.active_users_24h,
-            "active_users_3d": row.active_users_3d,
-            "active_users_7d": row.active_users_7d,
-            "active_users_30d": row.active_users_30d,
-        }
+        await session.execute(delete(User).where(User.user_id == user_id))
+        await session.commit()
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from bot.database.models import User
+from bot.database.requests.users import add_user, update_users
+from bot.utils.config import settings
+from bot.utils.periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+
+class UserCache:
+    """Кеш пользователей в памяти процесса с отложенной записью изменений.
+
+    Записи живут `ttl` секунд, при превышении `max_size` вытесняются давно не
+    использованные (LRU). Изменения профиля копятся в буфере и раз в
+    `flush_interval` секунд записываются в БД одним пакетным UPDATE, поэтому
+    для уже известного пользователя обработка апдейта не обращается к БД.
+    """
+
+    def __init__(self, max_size: int, ttl: float, flush_interval: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self._users: OrderedDict[int, tuple[User, float]] = OrderedDict()
+        # users.id -> изменённые поля, ещё не записанные в БД
+        self._dirty: dict[int, dict] = {}
+        self._flusher = PeriodicTask("User changes flush", self.flush, flush_interval)
+        self._lock = asyncio.Lock()
+
+    async def get_user(self, user_id: int, full_name: str, username: str | None) -> User:
+        """Пользователь для апдейта: из кеша или из БД (с созданием при первом обращении).
+
+        Смена имени и повторное обращение заблокировавшего бота пользователя
+        попадают в буфер записи.
+        """
+        user = self._get_cached(user_id)
+        if user is None:
+            user = await add_user(user_id=user_id, full_name=full_name, username=username)
+            # Изменения, ещё не дошедшие до БД, новее прочитанной строки
+            for key, value in self._dirty.get(user.id, {}).items():
+                setattr(user, key, value)
+            self._put(user_id, user)
+
+        if user.full_name != full_name or user.username != username:
+            self._update(user, full_name=full_name, username=username)
+        if user.is_blocked:
+            self._update(user, is_blocked=False, blocked_at=None)
+        return user
+
+    def mark_blocked(self, user_id: int):
+        """Синхронизирует кеш с блокировкой, записанной в БД напрямую."""
+        entry = self._users.get(user_id)
+        if entry is None:
+            return
+        user = entry[0]
+        user.is_blocked = True
+        changes = self._dirty.get(user.id)
+        if changes:
+            changes.pop("is_blocked", None)
+            changes.pop("blocked_at", None)
+
+    def _get_cached(self, user_id: int) -> User | None:
+        entry = self._users.get(user_id)
+        if entry is None:
+            return None
+        user, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._users[user_id]
+            return None
+        self._users.move_to_end(user_id)
+        return user
+
+    def _put(self, user_id: int, user: User):
+        self._users[user_id] = (user, time.monotonic() + self.ttl)
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_size:
+            self._users.popitem(last=False)
+
+    def _update(self, user: User, **values):
+        for key, value in values.items():
+            setattr(user, key, value)
+        self._dirty.setdefault(user.id, {}).update(values)
+
+    def start(self):
+        self._flusher.start()
+
+    async def stop(self):
+        # Прерванный flush успевает вернуть свой пакет в буфер до финальной записи
+        await self._flusher.stop()
+        await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, {}
+            try:
+                await update_users([{"id": pk, **values} for pk, values in dirty.items() if values])
+            except BaseException:
+                # Вернуть в буфер (в том числе при отмене), не перетирая более свежие изменения
+                for pk, values in dirty.items():
+                    self._dirty[pk] = {**values, **self._dirty.get(pk, {})}
+                raise
+
+
+user_cache = UserCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL, settings.USER_CACHE_FLUSH_INTERVAL)
@@ -0,0 +1,125 @@
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from bot.database.requests.stats import (
+    get_cohort_retention,
+    get_cohort_sizes,
+    get_current_day_stats,
+    get_daily_stats,
+    get_new_users_total,
+    reconcile_daily_stats,
+)
+from bot.utils.config import settings
+from bot.utils.periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+# Окна статистики в днях (по UTC), включая текущий день
+WINDOWS = {"1d": 1, "3d": 3, "7d": 7, "30d": 30}
+COHORT_WEEKS = 12
+
+
+class UserStats:
+    """Статистика пользователей из дневных агрегатов user_daily_stats.
+
+    Прошедшие дни читаются из агрегатов, текущий день считается по индексам
+    users и кешируется на `cache_ttl` секунд. Фоновая задача раз в
+    `reconcile_interval` секунд пересчитывает последние `reconcile_days` дней,
+    между пересчётами агрегаты поддерживает сброс активности.
+    """
+
+    def __init__(self, cache_ttl: float, reconcile_interval: float, reconcile_days: int):
+        self.cache_ttl = cache_ttl
+        self.reconcile_interval = reconcile_interval
+        self.reconcile_days = reconcile_days
+        self._current_day: tuple[datetime, float, dict] | None = None
+        self._reconciler = PeriodicTask("User daily stats reconcile", self.reconcile, reconcile_interval,
+                                        immediate=True)
+
+    def start(self):
+        self._reconciler.start()
+
+    async def stop(self):
+        await self._reconciler.stop()
+
+    async def reconcile(self):
+        day_start = _day_start(datetime.now(timezone.utc))
+        since_ts = day_start - timedelta(days=self.reconcile_days - 1)
+        await reconcile_daily_stats(since_ts.date(), day_start.date(), since_ts)
+
+    async def _get_current_day(self, day_start: datetime) -> dict:
+        cached = self._current_day
+        if cached and cached[0] == day_start and cached[1] > time.monotonic():
+            return cached[2]
+        stats = await get_current_day_stats(day_start)
+        self._current_day = (day_start, time.monotonic() + self.cache_ttl, stats)
+        return stats
+
+    async def get_stats(self) -> dict:
+        """
+        Ключи в словаре:
+            - total_users
+            - new_users_1d, new_users_3d, new_users_7d, new_users_30d
+            - active_users_1d, active_users_3d, active_users_7d, active_users_30d
+            - blocked_users
+        """
+        day_start = _day_start(datetime.now(timezone.utc))
+        today = day_start.date()
+        current = await self._get_current_day(day_start)
+        rows = await get_daily_stats(today - timedelta(days=max(WINDOWS.values()) - 1), today)
+
+        stats = {
+            "total_users": await get_new_users_total(today) + current["new_users"],
+            "blocked_users": current["blocked_users"],
+        }
+        for name, days in WINDOWS.items():
+            since = today - timedelta(days=days - 1)
+            window = [row for row in rows if row.day >= since]
+            stats[f"new_users_{name}"] = current["new_users"] + sum(row.new_users for row in window)
+            stats[f"active_users_{name}"] = current["active_users"] + sum(row.last_active_users for row in window)
+        return stats
+
+    async def get_retention(self) -> dict:
+        """DAU/WAU/MAU, stickiness и удержание недельных когорт за COHORT_WEEKS недель.
+
+        Всё читается из агрегатов: user_daily_stats и cohort_retention.
+        Ключ cohorts — список (неделя, размер когорты, [активных через 0, 1, ... недель]).
+        """
+        stats = await self.get_stats()
+        today = _day_start(datetime.now(timezone.utc)).date()
+        rows = await get_daily_stats(today - timedelta(days=30), today + timedelta(days=1))
+        dau = next((row.active_users for row in rows if row.day == today), 0)
+        past = [row.active_users for row in rows if row.day < today]
+        avg_dau = sum(past) / len(past) if past else dau
+        mau = stats["active_users_30d"]
+
+        current_week = today - timedelta(days=today.weekday())
+        since = current_week - timedelta(weeks=COHORT_WEEKS - 1)
+        sizes = await get_cohort_sizes(since)
+        active: dict = {}
+        for row in await get_cohort_retention(since):
+            active.setdefault(row.cohort_week, {})[row.week_offset] = row.users
+
+        cohorts = []
+        for i in range(COHORT_WEEKS):
+            week = since + timedelta(weeks=i)
+            weeks_passed = (current_week - week).days // 7
+            by_offset = active.get(week, {})
+            cohorts.append((week, sizes.get(week, 0), [by_offset.get(n, 0) for n in range(weeks_passed + 1)]))
+
+        return {
+            "dau": dau,
+            "avg_dau": avg_dau,
+            "wau": stats["active_users_7d"],
+            "mau": mau,
+            "stickiness": avg_dau / mau if mau else 0.0,
+            "cohorts": cohorts,
+        }
+
+
+def _day_start(now: datetime) -> datetime:
+    return now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+user_stats = UserStats(settings.STATS_CACHE_TTL, settings.STATS_RECONCILE_INTERVAL, settings.STATS_RECONCILE_DAYS)
@@ -24,4 +24,50 @@ ADMIN_MASS_MAIL_START_TEXT = (
     "Пожалуйста, подождите, это может занять некоторое время."
 )
 
-ADMIN_MASS_MAIL_END_TEXT = "<b>Рассылка завершена!</b>"
\ No newline at end of file
+ADMIN_MASS_MAIL_PROGRESS_TEXT = (
+    "<b>Рассылка идёт...</b>\n\n"
+    "Обработано: {processed}/{total}\n"
+    "Доставлено: {sent}\n"
+    "Заблокировали бота: {blocked}\n"
+    "Ошибок: {failed}\n"
+    "Скорость: {rate:.1f} сообщ./с\n"
+    "Осталось: {eta}"
+)
+
+ADMIN_MASS_MAIL_END_TEXT = (
+    "<b>Рассылка завершена!</b>\n\n"
+    "Доставлено: {sent}\n"
+    "Заблокировали бота: {blocked}\n"
+    "Ошибок: {failed}"
+)
+
+ADMIN_BROADCASTS_TEXT = "<b>Последние рассылки</b>\n\n{}"
+ADMIN_BROADCASTS_ROW_TEXT = (
+    "#{id} от {date} ({status}): доставлено {sent}, заблокировали {blocked}, ошибок {failed} из {total}"
+)
+ADMIN_BROADCASTS_EMPTY_TEXT = "Рассылок ещё не было"
+
+ADMIN_RETENTION_TEXT = (
+    "<b>Активность и удержание</b>\n\n"
+    "<blockquote>"
+    "DAU сегодня: {dau}\n"
+    "Средний DAU за 30д: {avg_dau:.0f}\n"
+    "WAU: {wau}\n"
+    "MAU: {mau}\n"
+    "Stickiness (DAU/MAU): {stickiness:.1%}"
+    "</blockquote>\n\n"
+    "<b>Удержание недельных когорт, %</b>\n"
+    "<pre>{cohorts}</pre>"
+)
+
+ADMIN_QUEUES_TEXT = (
+    "<b>Очереди обработчиков</b>\n\n"
+    "<blockquote>"
+    "В очередях: {depth}, обработчиков: {workers}\n"
+    "Ожидание: {wait}\n"
+    "Выполнение: {exec}"
+    "</blockquote>\n\n"
+    "{rows}"
+)
+ADMIN_QUEUES_ROW_TEXT = "{user_id} ({kind}): {depth} в очереди, ждёт {wait:.1f} с"
+ADMIN_QUEUES_EMPTY_TEXT = "Очереди пусты"
@@ -34,6 +34,57 @@ class Settings(BaseSettings):
 
     REDIS_URL: Optional[str] = None
 
+    USERS_BATCH_SIZE: int = 1000
+
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL: float = 600.0
+    USER_CACHE_FLUSH_INTERVAL: float = 5.0
+
+    ACTIVITY_FLUSH_INTERVAL: float = 30.0
+    ACTIVITY_BATCH_SIZE: int = 5000
+
+    STATS_RECONCILE_INTERVAL: float = 600.0
+    STATS_RECONCILE_DAYS: int = 2
+    STATS_CACHE_TTL: float = 60.0
+
+    ANTIFLOOD_MESSAGE_RATE: float = 2.0
+    ANTIFLOOD_MESSAGE_BURST: int = 2
+    ANTIFLOOD_CALLBACK_RATE: float = 2.0
+    ANTIFLOOD_CALLBACK_BURST: int = 2
+    ANTIFLOOD_MAX_USERS: int = 100000
+
+    QUEUE_IDLE_TIMEOUT: float = 60.0
+    QUEUE_MAX_SIZE: int = 20
+    QUEUE_MAX_CONCURRENCY: int = 100
+
+    ALBUM_DELAY: float = 0.3
+    ALBUM_MAX_WAIT: float = 2.0
+    ALBUM_MAX_GROUPS: int = 1000
+
+    METRICS_LOG_INTERVAL: float = 60.0
+
+    # Доля логируемых апдейтов по типу события (0..1)
+    LOG_SAMPLE_MESSAGE: float = 0.1
+    LOG_SAMPLE_CALLBACK: float = 0.1
+    # Не больше LOG_USER_RATE_PER_MINUTE записей об апдейтах одного пользователя в минуту
+    LOG_USER_RATE_PER_MINUTE: int = 10
+    LOG_TEXT_LIMIT: int = 200
+    # Пользователи, все апдейты которых логируются (формат как у ADMIN_IDS_RAW)
+    LOG_DEBUG_USER_IDS_RAW: Optional[str] = None
+
+    CATALOG_EXPORT_PATH: str = "categories.json"
+    CATALOG_EXPORT_DELAY: float = 2.0
+
+    BROADCAST_RATE: float = 25.0
+    BROADCAST_CONCURRENCY: int = 10
+    BROADCAST_MAX_RETRIES: int = 3
+    BROADCAST_PROGRESS_INTERVAL: float = 10.0
+    BROADCAST_BATCH_SIZE: int = 500
+    # Статусы доставки по получателям хранятся столько дней после завершения рассылки
+    BROADCAST_DELIVERIES_RETENTION_DAYS: int = 30
+    # Задачу рассылки, аренду которой не продлевали столько секунд, забирает другая реплика
+    BROADCAST_LEASE_TIMEOUT: float = 120.0
+
     @property
     def SQLALCHEMY_URL(self) -> str:
         """
@@ -55,11 +106,21 @@ class Settings(BaseSettings):
         - "1,2,3"
         - одиночное число "1"
         """
-        raw = self.ADMIN_IDS_RAW
-        if not raw:
-            return []
-        parts = raw.replace(",", " ").split()
-        return [int(x) for x in parts]
+        return _parse_ids(self.ADMIN_IDS_RAW)
+
+    @property
+    def LOG_DEBUG_USER_IDS(self) -> List[int]:
+        """
+        ID пользователей, чьи апдейты логируются без выборки и лимитов.
+        """
+        return _parse_ids(self.LOG_DEBUG_USER_IDS_RAW)
+
+
+def _parse_ids(raw: Optional[str]) -> List[int]:
+    if not raw:
+        return []
+    parts = raw.replace(",", " ").split()
+    return [int(x) for x in parts]
 
 
 @lru_cache(maxsize=1)
@@ -2,6 +2,7 @@ import logging
 import os
 
 from aiogram import types
+from aiogram.exceptions import TelegramForbiddenError
 
 from bot.database.requests import products as db
 
@@ -10,7 +11,11 @@ logger = logging.getLogger(__name__)
 
 async def send_item_content(message: types.Message, item, caption: str,
                             reply_markup: types.InlineKeyboardMarkup | None = None):
-    """Sends item content (text/photo/video/document/pptx) to the chat."""
+    """Sends item content (text/photo/video/document/pptx) to the chat.
+
+    TelegramForbiddenError is not treated as a broken file_id: it propagates
+    so the user gets flagged as blocked by BlockedUserRequestMiddleware.
+    """
     sent_success = False
 
     if item.content_type == "text":
@@ -27,6 +32,8 @@ async def send_item_content(message: types.Message, item, caption: str,
             elif item.content_type in ("document", "pptx"):
                 await message.answer_document(item.file_id, caption=caption, reply_markup=reply_markup)
             sent_success = True
+        except TelegramForbiddenError:
+            raise
         except Exception as e:
             logger.warning(f"Failed to send item {item.id} by file_id: {e}. Retrying from disk...")
             await db.update_item(item.id, file_id=None)
@@ -58,6 +65,8 @@ async def send_item_content(message: types.Message, item, caption: str,
                     new_file_id = msg.document.file_id
                 if new_file_id:
                     await db.update_item(item.id, file_id=new_file_id)
+        except TelegramForbiddenError:
+            raise
         except Exception as e:
             logger.error(f"Failed to send item {item.id} from disk: {e}")
             await message.answer(f"{caption}\n\nОшибка при отправке файла.", reply_markup=reply_markup)
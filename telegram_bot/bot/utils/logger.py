@@ -1,33 +1,188 @@
+import atexit
 import gzip
+import json
 import logging
 import os
+import queue
+import re
 import shutil
 import sys
-from logging.handlers import RotatingFileHandler
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from typing import Optional
 
+from bot.utils.metrics import metrics
 
-class CompressingRotatingFileHandler(RotatingFileHandler):
+
+class LogCompressor(threading.Thread):
     """
-    A RotatingFileHandler that compresses each rotated log file with gzip
-    to save disk space. Only the first-level rollover (.1) is compressed
-    - older backups (.2, .3, ...) are already gzipped by previous cycles.
+    Background thread that gzips rotated log files.
+
+    Each job is retried up to `retries` times with exponential backoff;
+    after a job (successful or not) the owning handler sweeps old backups.
     """
 
-    def doRollover(self):
-        """
-        Extend base rollover logic, then gzip the most recent backup.
-        """
-        super().doRollover()
+    def __init__(self, retries: int = 3, retry_delay: float = 1.0):
+        super().__init__(name="log-compressor", daemon=True)
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.jobs: "queue.Queue[tuple[str, CompressingRotatingFileHandler]]" = queue.Queue()
+
+    def submit(self, path: str, handler: "CompressingRotatingFileHandler"):
+        self.jobs.put((path, handler))
 
-        backup_file = f"{self.baseFilename}.1"
-        if os.path.exists(backup_file) and not backup_file.endswith(".gz"):
+    def run(self):
+        while True:
+            path, handler = self.jobs.get()
+            for attempt in range(self.retries + 1):
+                try:
+                    gzip_file(path)
+                    break
+                except FileNotFoundError:
+                    break
+                except Exception as exc:
+                    if attempt == self.retries:
+                        logging.getLogger(__name__).error("Failed to gzip log file %s: %s", path, exc)
+                    else:
+                        time.sleep(self.retry_delay * 2 ** attempt)
             try:
-                with open(backup_file, "rb") as src, gzip.open(f"{backup_file}.gz", "wb") as dst:
-                    shutil.copyfileobj(src, dst)
-                os.remove(backup_file)
+                handler.sweep()
             except Exception as exc:
-                logging.getLogger(__name__).exception("Failed to gzip log file %s: %s", backup_file, exc)
+                logging.getLogger(__name__).error("Failed to remove old log backups: %s", exc)
+
+
+def gzip_file(path: str):
+    """Compress `path` to `path.gz` via a temporary file, then remove the original."""
+    tmp_path = f"{path}.gz.tmp"
+    with open(path, "rb") as src, gzip.open(tmp_path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.replace(tmp_path, f"{path}.gz")
+    os.remove(path)
+
+
+_compressor: Optional[LogCompressor] = None
+_compressor_lock = threading.Lock()
+
+
+def get_compressor() -> LogCompressor:
+    global _compressor
+    with _compressor_lock:
+        if _compressor is None:
+            _compressor = LogCompressor()
+            _compressor.start()
+        return _compressor
+
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """
+    A RotatingFileHandler that renames the full log to a timestamped backup
+    (app.log.20240131-235959) and hands gzip compression to a background
+    thread, so rollover itself is just a rename.
+
+    Retention is enforced by a sweep after each compression: only the newest
+    `backupCount` backups are kept (0 = unlimited). Backups left uncompressed
+    by a previous run are compressed on startup.
+    """
+
+    BACKUP_SUFFIX = re.compile(r"^\.(\d{8}-\d{6}(?:-\d+)?)(\.gz)?$")
+
+    def __init__(self, filename, maxBytes=0, backupCount=0, encoding=None):
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount, encoding=encoding)
+        for path in self._backups():
+            if os.path.exists(f"{path}.gz.tmp"):
+                os.remove(f"{path}.gz.tmp")
+            if os.path.exists(path):
+                get_compressor().submit(path, self)
+        self.sweep()
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        backup_file = f"{self.baseFilename}.{time.strftime('%Y%m%d-%H%M%S')}"
+        candidate, n = backup_file, 0
+        while os.path.exists(candidate) or os.path.exists(f"{candidate}.gz"):
+            n += 1
+            candidate = f"{backup_file}-{n}"
+        if os.path.exists(self.baseFilename):
+            os.rename(self.baseFilename, candidate)
+            get_compressor().submit(candidate, self)
+
+        if not self.delay:
+            self.stream = self._open()
+
+    def _backups(self) -> list[str]:
+        """Backup paths without the .gz suffix, oldest first."""
+        directory, base = os.path.split(self.baseFilename)
+        stamps = set()
+        for name in os.listdir(directory):
+            if name.startswith(base):
+                match = self.BACKUP_SUFFIX.match(name[len(base):])
+                if match:
+                    stamps.add(match.group(1))
+        return [f"{self.baseFilename}.{stamp}" for stamp in sorted(stamps, key=_stamp_key)]
+
+    def sweep(self):
+        """Remove the oldest backups beyond `backupCount`."""
+        if self.backupCount <= 0:
+            return
+        backups = self._backups()
+        for path in backups[:-self.backupCount]:
+            for candidate in (path, f"{path}.gz"):
+                if os.path.exists(candidate):
+                    os.remove(candidate)
+
+
+def _stamp_key(stamp: str) -> tuple[str, int]:
+    # "20240131-235959" or "20240131-235959-2" for several rollovers within a second
+    date, clock, *n = stamp.split("-")
+    return date + clock, int(n[0]) if n else 0
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler over a bounded queue that never blocks the caller.
+
+    When the queue is full the record is dropped and counted in `dropped`.
+    Records are enqueued as-is: message formatting, like all handler I/O,
+    happens in the QueueListener thread.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, message, plus the dict
+    passed as `extra={"fields": {...}}` merged in at the top level.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            payload.update(fields)
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
 
 
 def setup_logging(level: int = logging.INFO,
@@ -36,12 +191,17 @@ def setup_logging(level: int = logging.INFO,
                   max_bytes: int = 100 * 1024 * 1024,
                   backup_count: int = 0,
                   error_dir: Optional[str] = None,
-                  error_log_filename: str = "error.log") -> logging.Logger:
+                  error_log_filename: str = "error.log",
+                  queue_size: int = 10000,
+                  log_format: str = "text") -> logging.Logger:
     """
     Configure root logger with:
       • Console handler (stdout) for Docker visibility
-      • Rotating file handler with gzip compression once file exceeds 1 MiB
-    Environment variable LOG_DIR can override log directory.
+      • Rotating file handler with background gzip compression of backups
+    All handlers run in a QueueListener thread behind a bounded queue;
+    the root logger only enqueues records.
+    Environment variables LOG_BACKUP_COUNT, LOG_QUEUE_SIZE and LOG_FORMAT
+    override the matching parameters; LOG_DIR is used when log_dir is None.
     Returns root logger instance for further use.
 
     Parameters
@@ -56,6 +216,10 @@ def setup_logging(level: int = logging.INFO,
         Maximum size in bytes before rollover (default 1 MiB).
     backup_count : int
         Number of compressed backups to keep (0 = unlimited).
+    queue_size : int
+        Maximum number of pending records; extra records are dropped.
+    log_format : str
+        "text" for the human-readable format, "json" for one JSON object per line.
     """
     if log_dir is None:
         log_dir = os.getenv("LOG_DIR", "logs")
@@ -64,7 +228,11 @@ def setup_logging(level: int = logging.INFO,
     if env_backup_count is not None and env_backup_count.isdigit():
         backup_count = int(env_backup_count)
 
-    internal_backup_count = backup_count if backup_count > 0 else 1000000
+    env_queue_size = os.getenv("LOG_QUEUE_SIZE")
+    if env_queue_size is not None and env_queue_size.isdigit():
+        queue_size = int(env_queue_size)
+
+    log_format = os.getenv("LOG_FORMAT", log_format).lower()
 
     os.makedirs(log_dir, exist_ok=True)
     log_path = os.path.join(log_dir, log_filename)
@@ -72,12 +240,15 @@ def setup_logging(level: int = logging.INFO,
     file_handler = CompressingRotatingFileHandler(
         filename=log_path,
         maxBytes=max_bytes,
-        backupCount=internal_backup_count,
+        backupCount=backup_count,
         encoding="utf-8"
     )
-    file_format = logging.Formatter(
-        "%(asctime)s | %(levelname)-8s | %(name)s | %(message)s"
-    )
+    if log_format == "json":
+        file_format = JsonFormatter()
+    else:
+        file_format = logging.Formatter(
+            "%(asctime)s | %(levelname)-8s | %(name)s | %(message)s"
+        )
     file_handler.setFormatter(file_format)
 
     console_handler = logging.StreamHandler(sys.stdout)
@@ -100,16 +271,23 @@ def setup_logging(level: int = logging.INFO,
         error_file_handler = CompressingRotatingFileHandler(
             filename=error_log_path,
             maxBytes=max_bytes,
-            backupCount=internal_backup_count,
+            backupCount=backup_count,
             encoding="utf-8"
         )
         error_file_handler.setFormatter(file_format)
         error_file_handler.setLevel(logging.ERROR)
         handlers.append(error_file_handler)
 
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    metrics.gauge("log_dropped", lambda: queue_handler.dropped)
+
     logging.basicConfig(
         level=level,
-        handlers=handlers,
+        handlers=[queue_handler],
         force=True,
     )
 
@@ -0,0 +1,123 @@
+import bisect
+import logging
+from typing import Callable, Dict, Optional, Sequence
+
+from bot.utils.periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+# Bucket upper bounds in seconds; the last bucket catches everything above
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class HistogramSnapshot:
+    def __init__(self, bounds: Sequence[float], counts: Sequence[int], total: float):
+        self.bounds = bounds
+        self.counts = list(counts)
+        self.total = total
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the q-th quantile
+        (inf if it falls into the overflow bucket).
+        """
+        count = self.count
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.bounds[i] if i < len(self.bounds) else float("inf")
+        return float("inf")
+
+    def __sub__(self, other: "HistogramSnapshot") -> "HistogramSnapshot":
+        return HistogramSnapshot(
+            self.bounds,
+            [a - b for a, b in zip(self.counts, other.counts)],
+            self.total - other.total,
+        )
+
+    def describe(self) -> str:
+        if not self.count:
+            return "n=0"
+        return (f"n={self.count} mean={self.mean * 1000:.0f}ms "
+                f"p50={_fmt(self.quantile(0.5))} p95={_fmt(self.quantile(0.95))} p99={_fmt(self.quantile(0.99))}")
+
+
+class Histogram:
+    """Cumulative fixed-bucket histogram of durations in seconds."""
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        self._counts = [0] * (len(self.bounds) + 1)
+        self._total = 0.0
+
+    def observe(self, value: float):
+        self._counts[bisect.bisect_left(self.bounds, value)] += 1
+        self._total += value
+
+    def snapshot(self) -> HistogramSnapshot:
+        return HistogramSnapshot(self.bounds, self._counts, self._total)
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics: histograms plus gauges read through callbacks.
+
+    `start()` launches a task that logs every metric once per `interval`
+    seconds; histograms are reported for that interval only.
+    """
+
+    def __init__(self):
+        self.histograms: Dict[str, Histogram] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+        self._reporter: Optional[PeriodicTask] = None
+        self._previous: Dict[str, HistogramSnapshot] = {}
+
+    def histogram(self, name: str, bounds: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        if name not in self.histograms:
+            self.histograms[name] = Histogram(bounds)
+        return self.histograms[name]
+
+    def gauge(self, name: str, read: Callable[[], float]):
+        self.gauges[name] = read
+
+    def start(self, interval: float):
+        if interval > 0:
+            self._previous = {name: h.snapshot() for name, h in self.histograms.items()}
+            self._reporter = PeriodicTask("Metrics report", self._report, interval)
+            self._reporter.start()
+
+    async def stop(self):
+        if self._reporter:
+            await self._reporter.stop()
+            self._reporter = None
+
+    async def _report(self):
+        current = {name: h.snapshot() for name, h in self.histograms.items()}
+        parts = [f"{name}={read()}" for name, read in self.gauges.items()]
+        for name, snapshot in current.items():
+            if name in self._previous:
+                snapshot = snapshot - self._previous[name]
+            parts.append(f"{name}[{snapshot.describe()}]")
+        self._previous = current
+        logger.info("metrics: %s", " ".join(parts))
+
+
+def _fmt(seconds: float) -> str:
+    if seconds == float("inf"):
+        return "inf"
+    return f"<={seconds * 1000:.0f}ms"
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,45 @@
+import asyncio
+import contextlib
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    Calls `callback` every `interval` seconds in a background task.
+
+    Errors are logged and do not stop the loop. With `immediate` the first call
+    happens right after `start()` instead of after the first interval.
+    `stop()` cancels the task and waits for it, so a call interrupted mid-way
+    has finished its own cleanup before the owner does a final flush.
+    """
+
+    def __init__(self, name: str, callback: Callable[[], Awaitable], interval: float, immediate: bool = False):
+        self.name = name
+        self.callback = callback
+        self.interval = interval
+        self.immediate = immediate
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def _loop(self):
+        if not self.immediate:
+            await asyncio.sleep(self.interval)
+        while True:
+            try:
+                await self.callback()
+            except Exception as e:
+                logger.exception(f"{self.name} failed: {e}")
+            await asyncio.sleep(self.interval)
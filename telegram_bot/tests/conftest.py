@@ -0,0 +1,13 @@
+import os
+
+# Settings требуют подключения к Telegram и БД; тестам хватает заглушек,
+# реальные соединения в них не открываются
+for name, value in {
+    "TG_TOKEN": "123456:test",
+    "SQLALCHEMY_DB_NAME": "test",
+    "SQLALCHEMY_IP": "localhost",
+    "SQLALCHEMY_PORT": "5432",
+    "SQLALCHEMY_USER": "test",
+    "SQLALCHEMY_PASSWORD": "test",
+}.items():
+    os.environ.setdefault(name, value)
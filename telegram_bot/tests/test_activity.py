@@ -0,0 +1,30 @@
+import asyncio
+
+import pytest
+
+from bot.database import activity
+from bot.database.activity import ActivityTracker
+
+
+@pytest.mark.asyncio
+async def test_stop_during_flush_keeps_batch(monkeypatch):
+    written: dict[int, object] = {}
+    flushing = asyncio.Event()
+
+    async def update_last_activity(batch: dict):
+        if not flushing.is_set():
+            # Первая запись зависает, пока её не прервёт stop()
+            flushing.set()
+            await asyncio.sleep(10)
+        written.update(batch)
+
+    monkeypatch.setattr(activity, "update_last_activity", update_last_activity)
+    tracker = ActivityTracker(flush_interval=0.01, batch_size=100)
+    tracker.touch(1)
+    tracker.touch(2)
+    tracker.start()
+
+    await asyncio.wait_for(flushing.wait(), timeout=1)
+    await tracker.stop()
+
+    assert set(written) == {1, 2}
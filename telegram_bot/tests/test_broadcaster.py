@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from bot.aiogram_bot.misc.broadcaster import Broadcaster, BroadcastStats
+from bot.database.requests.broadcasts import SENT
+
+
+@pytest.mark.asyncio
+async def test_slow_recipient_does_not_stall_stream():
+    finished: list[int] = []
+
+    async def send(chat_id: int):
+        if chat_id == 0:
+            await asyncio.sleep(0.3)
+        finished.append(chat_id)
+
+    async def recipients():
+        for chat_id in range(30):
+            yield chat_id
+
+    broadcaster = Broadcaster(send, BroadcastStats(30), rate=10_000, concurrency=3)
+    results = await asyncio.wait_for(broadcaster.deliver(recipients(), results={}), timeout=1)
+
+    assert results == {chat_id: SENT for chat_id in range(30)}
+    # Пока первый получатель ждёт, остальные воркеры отправили всех прочих
+    assert finished[-1] == 0
+    assert broadcaster.stats.sent == 30
+
+
+@pytest.mark.asyncio
+async def test_stream_is_read_only_as_workers_free_up():
+    release = asyncio.Event()
+    requested = 0
+
+    async def send(chat_id: int):
+        await release.wait()
+
+    async def recipients():
+        nonlocal requested
+        for chat_id in range(100):
+            requested += 1
+            yield chat_id
+
+    broadcaster = Broadcaster(send, BroadcastStats(100), rate=10_000, concurrency=4)
+    task = asyncio.create_task(broadcaster.deliver(recipients()))
+    await asyncio.sleep(0.05)
+
+    # Отправляются concurrency, ещё столько же ждут в очереди и один — у put()
+    assert requested <= 2 * broadcaster.concurrency + 1
+    release.set()
+    await asyncio.wait_for(task, timeout=1)
+    assert requested == 100
@@ -0,0 +1,44 @@
+from bot.database.catalog import CatalogSnapshot
+from bot.database.models import Category, Item
+
+
+def make_catalog() -> CatalogSnapshot:
+    catalog = CatalogSnapshot()
+    catalog.rebuild(
+        [
+            Category(id=1, name="root", sort_order=0, parent_id=None),
+            Category(id=2, name="child", sort_order=0, parent_id=1),
+            Category(id=3, name="other", sort_order=1, parent_id=None),
+        ],
+        [
+            Item(id=10, name="a", sort_order=0, category_id=2),
+            Item(id=11, name="b", sort_order=1, category_id=2),
+        ],
+    )
+    return catalog
+
+
+def test_apply_delta_matches_writer_changes():
+    writer, reader = make_catalog(), make_catalog()
+    notified = []
+    reader.add_listener(notified.append)
+
+    touched = set()
+    writer.add_listener(lambda ids: touched.update(ids))
+    writer.patch_item(11, category_id=3)
+    writer.put_category(Category(id=4, name="new", sort_order=0, parent_id=3))
+    writer.remove_category(1)
+
+    reader.apply_delta(
+        touched,
+        [writer.categories[c] for c in touched if c in writer.categories],
+        [item for c in touched for item in writer.get_items(c)],
+    )
+
+    assert notified == [touched]
+    assert set(reader.categories) == set(writer.categories) == {3, 4}
+    assert set(reader.items) == set(writer.items) == {11}
+    assert [c.id for c in reader.get_children(None)] == [3]
+    assert [c.id for c in reader.get_children(3)] == [4]
+    assert [i.id for i in reader.get_items(3)] == [11]
+    assert reader.get_items(2) == []
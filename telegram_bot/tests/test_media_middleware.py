@@ -0,0 +1,116 @@
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+from aiogram.types import Chat, Message
+
+from bot.aiogram_bot.misc.middlewares.media_middleware import MAX_ALBUM_SIZE, MediaMiddleware
+
+
+def make_part(message_id: int, media_group_id: str = "album") -> Message:
+    return Message(
+        message_id=message_id,
+        date=datetime.now(),
+        chat=Chat(id=1, type="private"),
+        media_group_id=media_group_id,
+    )
+
+
+class Recorder:
+    """Обработчик, запоминающий (первая часть, message_id всех частей) каждого вызова."""
+
+    def __init__(self):
+        self.calls: list[tuple[int, list[int]]] = []
+
+    async def __call__(self, message: Message, data: dict):
+        self.calls.append((message.message_id, [part.message_id for part in data["album"]]))
+
+
+def start(middleware: MediaMiddleware, handler: Recorder, part: Message) -> asyncio.Task:
+    """Первая часть ждёт сборки альбома, поэтому вызывается в отдельной задаче."""
+    return asyncio.create_task(middleware(handler, part, {}))
+
+
+@pytest.mark.asyncio
+async def test_out_of_order_parts_are_sorted():
+    middleware = MediaMiddleware(delay=0.05, max_wait=1, max_groups=10)
+    handler = Recorder()
+
+    task = start(middleware, handler, make_part(3))
+    await asyncio.sleep(0)
+    await middleware(handler, make_part(1), {})
+    await middleware(handler, make_part(2), {})
+    await asyncio.wait_for(task, timeout=1)
+
+    assert handler.calls == [(1, [1, 2, 3])]
+    assert not middleware.album_data
+
+
+@pytest.mark.asyncio
+async def test_part_after_delay_starts_new_album():
+    middleware = MediaMiddleware(delay=0.05, max_wait=1, max_groups=10)
+    handler = Recorder()
+
+    first = start(middleware, handler, make_part(1))
+    await asyncio.wait_for(first, timeout=1)
+    second = start(middleware, handler, make_part(2))
+    await asyncio.wait_for(second, timeout=1)
+
+    assert handler.calls == [(1, [1]), (2, [2])]
+
+
+@pytest.mark.asyncio
+async def test_max_wait_caps_debounce():
+    middleware = MediaMiddleware(delay=0.1, max_wait=0.3, max_groups=10)
+    handler = Recorder()
+
+    started_at = time.monotonic()
+    task = start(middleware, handler, make_part(1))
+    # Части приходят чаще delay и перезапускают таймер, но альбом закрывается по max_wait
+    for message_id in range(2, MAX_ALBUM_SIZE):
+        await asyncio.sleep(0.06)
+        if task.done():
+            break
+        await middleware(handler, make_part(message_id), {})
+    await asyncio.wait_for(task, timeout=1)
+
+    assert time.monotonic() - started_at < middleware.max_wait + 0.1
+    [(first_part, album)] = handler.calls
+    assert first_part == 1
+    assert 2 < len(album) < MAX_ALBUM_SIZE - 1
+
+
+@pytest.mark.asyncio
+async def test_tenth_part_finishes_album_immediately():
+    middleware = MediaMiddleware(delay=60, max_wait=60, max_groups=10)
+    handler = Recorder()
+
+    task = start(middleware, handler, make_part(1))
+    await asyncio.sleep(0)
+    for message_id in range(2, MAX_ALBUM_SIZE + 1):
+        await middleware(handler, make_part(message_id), {})
+    await asyncio.wait_for(task, timeout=1)
+
+    assert handler.calls == [(1, list(range(1, MAX_ALBUM_SIZE + 1)))]
+    assert not middleware.album_data
+
+
+@pytest.mark.asyncio
+async def test_oldest_album_evicted_over_max_groups():
+    middleware = MediaMiddleware(delay=60, max_wait=60, max_groups=2)
+    handler = Recorder()
+
+    oldest = start(middleware, handler, make_part(1, "a"))
+    await asyncio.sleep(0)
+    pending = [start(middleware, handler, make_part(2, "b"))]
+    await asyncio.sleep(0)
+    pending.append(start(middleware, handler, make_part(3, "c")))
+
+    await asyncio.wait_for(oldest, timeout=1)
+    assert handler.calls == [(1, [1])]
+    assert list(middleware.album_data) == ["b", "c"]
+
+    for media_group_id, group in list(middleware.album_data.items()):
+        middleware._finish(media_group_id, group)
+    await asyncio.gather(*pending)
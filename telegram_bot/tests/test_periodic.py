@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from bot.utils.periodic import PeriodicTask
+
+
+@pytest.mark.asyncio
+async def test_errors_do_not_stop_the_loop():
+    calls = 0
+
+    async def callback():
+        nonlocal calls
+        calls += 1
+        raise RuntimeError("boom")
+
+    task = PeriodicTask("test", callback, interval=0.01, immediate=True)
+    task.start()
+    await asyncio.sleep(0.05)
+    await task.stop()
+
+    assert calls >= 2
+
+
+@pytest.mark.asyncio
+async def test_stop_waits_for_interrupted_call():
+    cleaned_up = asyncio.Event()
+
+    async def callback():
+        try:
+            await asyncio.sleep(10)
+        finally:
+            cleaned_up.set()
+
+    task = PeriodicTask("test", callback, interval=0, immediate=True)
+    task.start()
+    await asyncio.sleep(0)
+    await task.stop()
+
+    assert cleaned_up.is_set()
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+from datetime import datetime
+
+import pytest
+from aiogram.types import CallbackQuery, Chat, Message, User
+
+from bot.aiogram_bot.misc.middlewares.log_middleware import LogMiddleware
+from bot.aiogram_bot.misc.middlewares.queue_middleware import QueueMessagesMiddleware, UserQueue
+
+USERS = 200
+EVENTS_PER_USER = 5
+CONCURRENCY = 8
+IDLE_TIMEOUT = 0.05
+
+
+def make_message(user_id: int, message_id: int) -> Message:
+    return Message(
+        message_id=message_id,
+        date=datetime.now(),
+        chat=Chat(id=user_id, type="private"),
+        from_user=User(id=user_id, is_bot=False, first_name="test"),
+        text=str(message_id),
+    )
+
+
+def make_callback(user_id: int, message_id: int, data: str) -> CallbackQuery:
+    return CallbackQuery(
+        id=data,
+        from_user=User(id=user_id, is_bot=False, first_name="test"),
+        chat_instance="test",
+        message=make_message(user_id, message_id),
+        data=data,
+    )
+
+
+async def handler_stub(event, data: dict):
+    pass
+
+
+def queued(queue: UserQueue) -> list:
+    return [event.data if isinstance(event, CallbackQuery) else event.message_id for event, *_ in queue.events]
+
+
+@pytest.fixture
+def middleware():
+    middleware = QueueMessagesMiddleware("test", asyncio.Semaphore(CONCURRENCY), idle_timeout=IDLE_TIMEOUT)
+    yield middleware
+    QueueMessagesMiddleware.instances.remove(middleware)
+
+
+@pytest.mark.asyncio
+async def test_load_respects_semaphore_order_and_reaps_idle_queues(middleware):
+    running = max_running = 0
+    processed: dict[int, list[int]] = {}
+
+    async def handler(event: Message, data: dict):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        try:
+            await asyncio.sleep(0.001)
+            processed.setdefault(event.from_user.id, []).append(event.message_id)
+        finally:
+            running -= 1
+
+    for message_id in range(EVENTS_PER_USER):
+        for user_id in range(1, USERS + 1):
+            await middleware(handler, make_message(user_id, message_id), {})
+    workers = [queue.worker for queue in middleware.user_queues.values()]
+    assert len(workers) == USERS
+
+    # Обработчики очередей сами завершаются после idle_timeout без событий
+    await asyncio.wait_for(asyncio.gather(*workers), timeout=10)
+
+    assert middleware.user_queues == {}
+    assert 1 < max_running <= CONCURRENCY
+    assert processed == {user_id: list(range(EVENTS_PER_USER)) for user_id in range(1, USERS + 1)}
+
+
+@pytest.mark.asyncio
+async def test_worker_restarts_after_idle(middleware):
+    handled = []
+
+    async def handler(event: Message, data: dict):
+        handled.append(event.message_id)
+
+    await middleware(handler, make_message(1, 1), {})
+    await asyncio.wait_for(middleware.user_queues[1].worker, timeout=1)
+    assert middleware.user_queues == {}
+
+    await middleware(handler, make_message(1, 2), {})
+    await asyncio.wait_for(middleware.user_queues[1].worker, timeout=1)
+    assert handled == [1, 2]
+
+
+def test_enqueue_replaces_stale_callback_of_same_message(middleware):
+    queue = UserQueue()
+    for event in (make_callback(1, 10, "a"), make_message(1, 11), make_callback(1, 12, "b"), make_callback(1, 10, "c")):
+        middleware.enqueue(queue, (event, handler_stub, {}, 0.0))
+
+    # Ожидающее нажатие на сообщение 10 заменено новым, остальные не тронуты
+    assert queued(queue) == [11, "b", "c"]
+
+
+def test_enqueue_drops_callbacks_then_updates_when_full(middleware):
+    middleware.max_size = 3
+    queue = UserQueue()
+    for event in (make_message(1, 1), make_callback(1, 10, "a"), make_message(1, 2), make_message(1, 3)):
+        middleware.enqueue(queue, (event, handler_stub, {}, 0.0))
+
+    # При переполнении вытесняется callback, а не сообщение
+    assert queued(queue) == [1, 2, 3]
+
+    middleware.enqueue(queue, (make_message(1, 4), handler_stub, {}, 0.0))
+    middleware.enqueue(queue, (make_callback(1, 11, "b"), handler_stub, {}, 0.0))
+
+    # Без callback'ов в очереди новые события отбрасываются
+    assert queued(queue) == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_failed_handler_is_logged_once(middleware, caplog):
+    log_middleware = LogMiddleware()
+
+    async def failing(event: Message, data: dict):
+        raise RuntimeError("boom")
+
+    async def handler(event: Message, data: dict):
+        return await log_middleware(failing, event, data)
+
+    with caplog.at_level(logging.ERROR):
+        await middleware(handler, make_message(1, 1), {})
+        await asyncio.wait_for(middleware.user_queues[1].worker, timeout=1)
+
+    errors = [record for record in caplog.records if record.levelno >= logging.ERROR]
+    assert len(errors) == 1
+    assert errors[0].exc_info[0] is RuntimeError
@@ -0,0 +1,112 @@
+import asyncio
+import tracemalloc
+
+import pytest
+
+from bot.aiogram_bot.misc import rate_limiter
+from bot.aiogram_bot.misc.rate_limiter import RedisTokenBucketLimiter, TokenBucketLimiter
+
+# Потолок памяти лимитера на миллион пользователей при max_size=10_000
+MEMORY_CEILING = 8 * 1024 * 1024
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock)
+    return clock
+
+
+def test_burst_then_refill(clock):
+    limiter = TokenBucketLimiter(rate=2, burst=2, max_size=10)
+
+    assert limiter.allow(1)
+    assert limiter.allow(1)
+    assert not limiter.allow(1)
+
+    clock.now += 0.5
+    assert limiter.allow(1)
+    assert not limiter.allow(1)
+
+
+def test_memory_bounded_by_max_size_for_million_users(clock):
+    limiter = TokenBucketLimiter(rate=2, burst=2, max_size=10_000)
+
+    tracemalloc.start()
+    try:
+        for user_id in range(1_000_000):
+            limiter.allow(user_id)
+            if user_id % 1000 == 0:
+                clock.now += 0.0001
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(limiter) <= limiter.max_size
+    # 10 000 корзин занимают ~3 МБ, без ограничения миллион занял бы сотни МБ
+    assert peak < MEMORY_CEILING
+    # Вытесняются давно не использованные, последние пользователи остаются
+    assert not limiter.is_idle(999_999)
+
+
+def test_idle_buckets_expire(clock):
+    limiter = TokenBucketLimiter(rate=2, burst=2, max_size=10_000)
+    for user_id in range(100):
+        limiter.allow(user_id)
+
+    clock.now += limiter.ttl
+    limiter.allow(-1)
+
+    assert len(limiter) == 1
+
+
+class FakeScript:
+    """Заменяет Lua-скрипт Redis: возвращает заданный ответ и считает вызовы."""
+
+    def __init__(self, allowed: int):
+        self.allowed = allowed
+        self.calls = 0
+
+    async def __call__(self, keys, args):
+        self.calls += 1
+        return self.allowed
+
+
+@pytest.mark.asyncio
+async def test_background_redis_deny_is_enforced_locally(clock):
+    limiter = RedisTokenBucketLimiter("redis://localhost", "test", rate=2, burst=2, max_size=10)
+    limiter._script = FakeScript(allowed=0)
+
+    # Первое событие после простоя пропускается, Redis проверяется в фоне
+    assert await limiter.check(1)
+    await asyncio.gather(*limiter._background)
+    assert limiter._script.calls == 1
+
+    # Отказ Redis действует на этой реплике без повторного обращения к нему
+    assert not await limiter.check(1)
+    assert limiter._script.calls == 1
+    assert await limiter.check(2)
+
+    clock.now += 1 / limiter.rate
+    limiter._script.allowed = 1
+    assert await limiter.check(1)
+
+
+@pytest.mark.asyncio
+async def test_redis_deny_memory_bounded(clock):
+    limiter = RedisTokenBucketLimiter("redis://localhost", "test", rate=2, burst=2, max_size=10)
+    limiter._script = FakeScript(allowed=0)
+
+    for user_id in range(100):
+        await limiter.check(user_id)
+    await asyncio.gather(*limiter._background)
+
+    assert len(limiter._denied_until) <= limiter.local.max_size
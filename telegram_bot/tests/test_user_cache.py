@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+from bot.database import user_cache as user_cache_module
+from bot.database.user_cache import UserCache
+
+
+@pytest.mark.asyncio
+async def test_stop_during_flush_keeps_dirty_batch(monkeypatch):
+    written: list[dict] = []
+    flushing = asyncio.Event()
+
+    async def update_users(rows: list[dict]):
+        if not flushing.is_set():
+            # Первая запись зависает, пока её не прервёт stop()
+            flushing.set()
+            await asyncio.sleep(10)
+        written.extend(rows)
+
+    monkeypatch.setattr(user_cache_module, "update_users", update_users)
+    cache = UserCache(max_size=10, ttl=60, flush_interval=0.01)
+    cache._dirty = {1: {"full_name": "a"}, 2: {"username": "b"}}
+    cache.start()
+
+    await asyncio.wait_for(flushing.wait(), timeout=1)
+    await cache.stop()
+
+    assert sorted(written, key=lambda row: row["id"]) == [
+        {"id": 1, "full_name": "a"},
+        {"id": 2, "username": "b"},
+    ]